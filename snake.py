@@ -1,14 +1,41 @@
+import time
+STARTUP_T0 = time.perf_counter()  # 启动计时起点（尽量早于 import pygame）
+
 import sys
 import os
+import json
+import argparse
+import functools
 import random
 import pygame
 
+from collections import deque
+
+from snake_engine import SnakeEngine, UP, DOWN, LEFT, RIGHT
+from snake_replay import Replay, ReplayPlayer, ReplayRecorder
+from snake_profiler import FrameProfiler
+from snake_autopilot import Autopilot
+
 # 配置
 CELL_SIZE = 20
 GRID_W, GRID_H = 30, 20
 WIDTH, HEIGHT = CELL_SIZE * GRID_W, CELL_SIZE * GRID_H
 OFFSET_X, OFFSET_Y = 0, 0  # 新增：绘制偏移以实现居中
+# 新增：大棋盘模式。整块棋盘在窗口里放不下（格子小于 MIN_CELL_SIZE）时启用摄像机，
+# 只显示 VIEW_W × VIEW_H 个格子的视口并跟随蛇头；CAM_X, CAM_Y 为视口左上角的格子坐标
+MIN_CELL_SIZE = 4
+CAMERA_CELL_SIZE = 16
+CAMERA_MARGIN = 0.25  # 蛇头离视口边缘不足该比例时摄像机开始跟随
+CAMERA = False
+VIEW_W, VIEW_H = GRID_W, GRID_H
+CAM_X, CAM_Y = 0, 0
 FPS = 10
+DISPLAY_FPS = 60  # 新增：绘制与输入的帧率，与模拟 tick 速率无关
+TURN_BUFFER = 3   # 新增：每 tick 消耗一个的转向缓冲长度，快速连按不会丢失
+MAX_TICKS_PER_FRAME = 5  # 新增：卡顿后单帧最多追赶的 tick 数
+AUTOPILOT_RESTART_DELAY = 3.0  # 新增：自动驾驶演示模式下，游戏结束后自动重开的等待秒数
+IDLE_WAIT_MS = 1000  # 新增：静止界面（菜单、设置、结束画面）阻塞等待事件的超时（毫秒）
+RESIZE_SETTLE_MS = 150  # 新增：最后一个 VIDEORESIZE 之后窗口尺寸保持这么久不变，才按新尺寸重建
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GREEN = (0, 200, 0)
@@ -32,8 +59,8 @@ settings = {
 
 def update_dimensions_from_cell():
     global WIDTH, HEIGHT
-    WIDTH = CELL_SIZE * GRID_W
-    HEIGHT = CELL_SIZE * GRID_H
+    WIDTH = CELL_SIZE * VIEW_W
+    HEIGHT = CELL_SIZE * VIEW_H
 
 # 新增：根据窗口大小计算偏移（居中，不拉伸）
 def update_offsets(win_w, win_h):
@@ -41,6 +68,53 @@ def update_offsets(win_w, win_h):
     OFFSET_X = (win_w - WIDTH) // 2 if win_w > WIDTH else 0
     OFFSET_Y = (win_h - HEIGHT) // 2 if win_h > HEIGHT else 0
 
+# 新增：按窗口大小决定格子尺寸与视口；放得下整块棋盘时视口即棋盘，否则进入摄像机模式
+def fit_board(win_w, win_h):
+    global CELL_SIZE, CAMERA, VIEW_W, VIEW_H
+    cell = min(win_w // GRID_W, win_h // GRID_H)
+    CAMERA = cell < MIN_CELL_SIZE
+    if CAMERA:
+        CELL_SIZE = CAMERA_CELL_SIZE
+        VIEW_W = max(1, min(GRID_W, win_w // CELL_SIZE))
+        VIEW_H = max(1, min(GRID_H, win_h // CELL_SIZE))
+    else:
+        CELL_SIZE = cell
+        VIEW_W, VIEW_H = GRID_W, GRID_H
+    update_dimensions_from_cell()
+    update_offsets(win_w, win_h)
+
+def _follow_axis(p, cam, view, size, wrap, center):
+    if view >= size:
+        return 0
+    rel = p - cam
+    if wrap:
+        rel %= size
+        if rel >= view + (size - view) // 2:
+            rel -= size  # 在视口左/上方
+    margin = int(view * CAMERA_MARGIN)
+    if center or rel < 0 or rel >= view:
+        cam = p - view // 2  # 蛇头不在视口内（开局、窗口变化）时直接居中
+    elif rel < margin:
+        cam -= margin - rel
+    elif rel > view - 1 - margin:
+        cam += rel - (view - 1 - margin)
+    if wrap:
+        return cam % size
+    return max(0, min(size - view, cam))
+
+# 新增：让视口跟随蛇头，返回摄像机是否移动（移动后需要整屏重绘）
+def follow_camera(head, wrap, center=False):
+    global CAM_X, CAM_Y
+    cam = (_follow_axis(head[0], CAM_X, VIEW_W, GRID_W, wrap, center),
+           _follow_axis(head[1], CAM_Y, VIEW_H, GRID_H, wrap, center))
+    if cam == (CAM_X, CAM_Y):
+        return False
+    CAM_X, CAM_Y = cam
+    return True
+
+def view_rect():
+    return pygame.Rect(OFFSET_X, OFFSET_Y, WIDTH, HEIGHT)
+
 # 新增：查找可用的中文字体（Windows 常见路径优先）
 def find_chinese_font():
     # 常见 Windows 字体文件名（按优先级）
@@ -55,133 +129,416 @@ def find_chinese_font():
     for p in candidates:
         if os.path.exists(p):
             return p
-    # 如果没有直接文件，尝试通过 pygame 的字体名匹配
+    # 如果没有直接文件，尝试通过 pygame 的字体名匹配（会调用 fontconfig，较慢，结果由 get_font_path 缓存）
     try:
-        available = pygame.font.get_fonts()
         names_to_try = ("msyh", "microsoftyahei", "simhei", "simsun", "arialunicode", "arialuni")
-        for name in names_to_try:
-            match = pygame.font.match_font(name)
-            if match:
-                return match
+        return pygame.font.match_font(names_to_try)
     except Exception:
         pass
     return None
 
-def random_food(snake):
-    while True:
-        pos = (random.randrange(GRID_W), random.randrange(GRID_H))
-        if pos not in snake:
-            return pos
+# 新增：字体路径磁盘缓存，避免每次启动都探测字体
+FONT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "snake-game", "font_path.json")
+# 安装/删除字体会改变所在目录的 mtime。字体通常装进已有的子目录（如 /usr/share/fonts/opentype/noto），
+# 所以递归取这些目录树中最新的目录 mtime 来让缓存（包括“没找到”的结果）失效；只 stat 目录，比 fc-list 快得多
+FONT_DIRS = [
+    r"C:\Windows\Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "fonts"),
+    os.path.join(os.path.expanduser("~"), ".fonts"),
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+]
+
+def font_dirs_mtime():
+    newest = {}
+    for d in FONT_DIRS:
+        if not os.path.isdir(d):
+            continue
+        m = os.path.getmtime(d)
+        for root, dirs, _ in os.walk(d):
+            for name in dirs:
+                try:
+                    m = max(m, os.path.getmtime(os.path.join(root, name)))
+                except OSError:
+                    pass
+        newest[d] = m
+    return newest
+
+def load_cached_font_path():
+    # 返回 (是否命中, 路径)；路径可以是 None（表示上次没找到中文字体）
+    try:
+        with open(FONT_CACHE_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["dirs"] != font_dirs_mtime():
+            return False, None
+        path = data["path"]
+        if path is None:
+            return True, None
+        if not isinstance(path, str) or not os.path.isfile(path) or os.path.getmtime(path) != data["mtime"]:
+            return False, None
+        return True, path
+    except (OSError, ValueError, KeyError, TypeError):
+        return False, None
+
+def save_cached_font_path(path):
+    try:
+        data = {
+            "path": path,
+            "mtime": os.path.getmtime(path) if path else None,
+            "dirs": font_dirs_mtime(),
+        }
+        os.makedirs(os.path.dirname(FONT_CACHE_FILE), exist_ok=True)
+        with open(FONT_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except OSError:
+        pass  # 缓存写不进去不影响游戏
+
+def get_font_path():
+    hit, path = load_cached_font_path()
+    if not hit:
+        path = find_chinese_font()
+        save_cached_font_path(path)
+    return path
+
+# 新增：每局自动录像（种子 + 设置 + 每 tick 方向），游戏结束时保存
+REPLAY_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "snake-game", "replays")
+
+def save_replay(recorder):
+    try:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        name = time.strftime("%Y%m%d-%H%M%S") + f"-{recorder.seed}.snkr"
+        recorder.save(os.path.join(REPLAY_DIR, name))
+    except OSError:
+        pass  # 录像写不进去不影响游戏
+
+# 新增：帧分析器（F3 切换叠加层，--profile FILE 导出逐帧耗时）
+profiler = FrameProfiler()
+
+# 新增：启动计时模式（--startup-time）：记录各阶段耗时，首帧显示后输出并退出
+startup_marks = None
+
+def mark_startup(phase):
+    if startup_marks is not None:
+        startup_marks[phase] = (time.perf_counter() - STARTUP_T0) * 1000.0
+
+def report_startup():
+    mark_startup("first_frame")
+    for phase, ms in startup_marks.items():
+        print(f"{phase}: {ms:.1f} ms")
+    pygame.quit(); sys.exit()
+
+# 新增：窗口被遮挡后重新露出时需要重画
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED)
+
+# 新增：阻塞到有事件或超时，再取出队列中其余事件；等待期间不占 CPU
+def wait_events(timeout_ms=IDLE_WAIT_MS):
+    pending = resize_wait_ms()
+    if pending is not None:
+        timeout_ms = max(1, min(timeout_ms, pending))  # 有待应用的窗口尺寸时到点醒来
+    event = pygame.event.wait(timeout_ms)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+# 按键 -> 方向编码
+KEY_ACTIONS = {
+    pygame.K_w: UP, pygame.K_UP: UP,
+    pygame.K_s: DOWN, pygame.K_DOWN: DOWN,
+    pygame.K_a: LEFT, pygame.K_LEFT: LEFT,
+    pygame.K_d: RIGHT, pygame.K_RIGHT: RIGHT,
+}
 
 def draw_cell(surface, pos, color):
-    x, y = pos
-    rect = pygame.Rect(OFFSET_X + x * CELL_SIZE, OFFSET_Y + y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-    pygame.draw.rect(surface, color, rect)
+    pygame.draw.rect(surface, color, cell_rect(pos))
 
 def draw_grid(surface):
-    # 使用偏移并只绘制网格区域，避免拉伸
-    for x in range(GRID_W + 1):
+    # 使用偏移并只绘制视口内的网格线，避免拉伸
+    for x in range(VIEW_W + 1):
         start = (OFFSET_X + x * CELL_SIZE, OFFSET_Y)
         end = (OFFSET_X + x * CELL_SIZE, OFFSET_Y + HEIGHT)
         pygame.draw.line(surface, (40,40,40), start, end)
-    for y in range(GRID_H + 1):
+    for y in range(VIEW_H + 1):
         start = (OFFSET_X, OFFSET_Y + y * CELL_SIZE)
         end = (OFFSET_X + WIDTH, OFFSET_Y + y * CELL_SIZE)
         pygame.draw.line(surface, (40,40,40), start, end)
 
+# 新增：绘制模式。"dirty" 只重画变化的格子并用 display.update(rects) 提交；"full" 每帧整屏重绘
+RENDER_MODE = "dirty"
+
+# 新增：预渲染静态背景层（黑底 + 网格线），只在窗口尺寸变化时重建
+def build_grid_layer(size):
+    layer = pygame.Surface(size).convert()
+    layer.fill(BLACK)
+    draw_grid(layer)
+    return layer
+
+# 新增：背景层缓存，键为决定网格线位置的布局参数；同一布局（重玩、菜单往返）只构建一次
+_grid_layer = (None, None)
+
+def get_grid_layer(size):
+    global _grid_layer
+    key = (size, CELL_SIZE, VIEW_W, VIEW_H, OFFSET_X, OFFSET_Y)
+    if _grid_layer[0] != key:
+        _grid_layer = (key, build_grid_layer(size))
+    return _grid_layer[1]
+
+# 新增：自动驾驶缓存。构造时要建哈密顿回路、邻接表和搜索缓冲，大棋盘上要几秒，
+# 所以按 (宽, 高, 难度) 只构建一次，每局开始时 reset() 复用
+_autopilot = (None, None)
+
+def get_autopilot(difficulty):
+    global _autopilot
+    key = (GRID_W, GRID_H, difficulty)
+    if _autopilot[0] != key:
+        _autopilot = (key, Autopilot(GRID_W, GRID_H, difficulty))
+    pilot = _autopilot[1]
+    pilot.reset()
+    return pilot
+
+# 新增：窗口尺寸变化的统一处理。拖动窗口时每秒会来几十个 VIDEORESIZE，事件只记下最新尺寸；
+# 尺寸静止 RESIZE_SETTLE_MS 后 settle_resize() 一次性重建显示 Surface、格子尺寸与偏移、背景层，
+# 拖动期间各界面照常按旧布局绘制，帧时间不受影响
+PENDING_SIZE = None  # 尚未应用的窗口尺寸
+PENDING_AT = 0.0     # 最后一个 VIDEORESIZE 的时刻（perf_counter 秒；只初始化 display 时 get_ticks() 恒为 0）
+
+def note_resize(event):
+    global PENDING_SIZE, PENDING_AT
+    PENDING_SIZE = (event.w, event.h)
+    PENDING_AT = time.perf_counter()
+
+# 距离可以应用新尺寸还要等多少毫秒；没有待应用的尺寸时为 None
+def resize_wait_ms():
+    if PENDING_SIZE is None:
+        return None
+    return max(0, int(RESIZE_SETTLE_MS - (time.perf_counter() - PENDING_AT) * 1000))
+
+# 尺寸已静止则应用并返回 True，调用方随后取 pygame.display.get_surface() 并整屏重画；
+# pygame 2 的显示 Surface 已随窗口变化，尺寸一致时不再 set_mode
+def settle_resize():
+    global PENDING_SIZE
+    if resize_wait_ms() != 0:
+        return False
+    size = PENDING_SIZE
+    PENDING_SIZE = None
+    if pygame.display.get_surface().get_size() != size:
+        pygame.display.set_mode(size, pygame.RESIZABLE)
+    fit_board(*size)
+    get_grid_layer(size)
+    return True
+
+def cell_rect(pos):
+    x, y = pos
+    if CAMERA:
+        # 棋盘坐标 -> 视口坐标；视口外的格子落在屏幕外
+        x = (x - CAM_X) % GRID_W
+        y = (y - CAM_Y) % GRID_H
+    return pygame.Rect(OFFSET_X + x * CELL_SIZE, OFFSET_Y + y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+# 新增：插值绘制。motion = (旧头, 释放的旧尾或 None, alpha)，alpha 为距上个 tick 的进度 0~1；
+# 蛇头从旧头格平滑移入新头格，尾巴从释放的格子平滑收回
+def lerp_rect(src, dst, alpha):
+    dx, dy = dst[0] - src[0], dst[1] - src[1]
+    if abs(dx) + abs(dy) != 1:  # 包裹穿越边界时不插值
+        return cell_rect(dst)
+    return cell_rect(src).move(round(dx * alpha * CELL_SIZE), round(dy * alpha * CELL_SIZE))
+
+def motion_cells(state, motion):
+    prev_head, prev_tail, _ = motion
+    cells = [prev_head, state.snake[0], state.snake[-1]]
+    if prev_tail is not None:
+        cells.append(prev_tail)
+    return cells
+
+def draw_motion(surface, state, motion, snake_color, head_color):
+    prev_head, prev_tail, alpha = motion
+    clip = surface.get_clip()
+    surface.set_clip(clip.clip(view_rect()))  # 视口边缘移入/移出的格子不画到视口外
+    if prev_tail is not None:
+        pygame.draw.rect(surface, snake_color, lerp_rect(prev_tail, state.snake[-1], alpha))
+    pygame.draw.rect(surface, head_color, lerp_rect(prev_head, state.snake[0], alpha))
+    surface.set_clip(clip)
+
+# 新增：按 occ 扫描视口坐标 [vx0, vx1] × [vy0, vy1] 内的格子，耗时只与范围大小有关，与蛇长和棋盘大小无关
+def draw_cells(surface, state, vx0, vx1, vy0, vy1, snake_color, head_color, motion):
+    head, food, occ = state.snake[0], state.food, state.occ
+    xs = [(CAM_X + vx) % GRID_W for vx in range(vx0, vx1 + 1)]
+    for vy in range(vy0, vy1 + 1):
+        y = (CAM_Y + vy) % GRID_H
+        row = y * GRID_W
+        for x in xs:
+            if occ[row + x]:
+                if (x, y) != head:
+                    draw_cell(surface, (x, y), snake_color)
+                elif motion is None:
+                    draw_cell(surface, (x, y), head_color)
+            elif (x, y) == food:
+                draw_cell(surface, (x, y), RED)
+    if motion is not None:
+        draw_motion(surface, state, motion, snake_color, head_color)
+
+def draw_board(surface, state, snake_color, head_color, motion=None):
+    if CAMERA:
+        # 大棋盘只画视口内的格子
+        draw_cells(surface, state, 0, VIEW_W - 1, 0, VIEW_H - 1, snake_color, head_color, motion)
+        return
+    # 食物（棋盘占满时没有食物）
+    if state.food is not None:
+        draw_cell(surface, state.food, RED)
+    # 蛇（有插值时头部由 draw_motion 绘制）
+    for i, seg in enumerate(state.snake):
+        if i == 0:
+            if motion is None:
+                draw_cell(surface, seg, head_color)
+        else:
+            draw_cell(surface, seg, snake_color)
+    if motion is not None:
+        draw_motion(surface, state, motion, snake_color, head_color)
+
+# 新增：用背景层还原一块区域，再只重画落在区域内的格子与 HUD（裁剪到区域内，避免文字重复叠加）
+def redraw_region(surface, grid_layer, rect, state, snake_color, head_color, hud, motion=None):
+    surface.set_clip(rect)
+    surface.blit(grid_layer, rect, rect)
+    x0 = max(0, (rect.left - OFFSET_X) // CELL_SIZE)
+    x1 = min(VIEW_W - 1, (rect.right - 1 - OFFSET_X) // CELL_SIZE)
+    y0 = max(0, (rect.top - OFFSET_Y) // CELL_SIZE)
+    y1 = min(VIEW_H - 1, (rect.bottom - 1 - OFFSET_Y) // CELL_SIZE)
+    draw_cells(surface, state, x0, x1, y0, y1, snake_color, head_color, motion)
+    for surf, r in hud:
+        if r.colliderect(rect):
+            surface.blit(surf, r)
+    surface.set_clip(None)
+
+# 英文翻译表（模块加载时构建一次；中文直接返回原文）
+TRANSLATIONS_EN = {
+    "贪吃蛇":"Snake",
+    "按 空格 / 回车 开始    Esc 退出":"Press Space/Enter to start    Esc to quit",
+    "方向键 或 WASD 控制移动":"Arrow keys or WASD to move",
+    "分数:":"Score:",
+    "游戏结束 - 按 R 重玩，Esc 退出":"Game Over - R to restart, Esc to quit",
+    "你赢了 - 按 R 重玩，Esc 退出":"You win - R to restart, Esc to quit",
+    "开始":"Start",
+    "设置":"Settings",
+    "退出":"Quit",
+    "语言":"Language",
+    "蛇颜色":"Snake Color",
+    "速度":"Speed",
+    "难度":"Difficulty",
+    "最大化适配":"Maximize adapt",
+    "开":"On",
+    "关":"Off",
+    "返回":"Back (Enter)",
+    "玩家:":"Players:",
+    "等待重生…":"Respawning...",
+    "连接已断开":"Disconnected"
+}
+
 def render_text(font, text, lang):
     # 简单语言支持：中文/英文切换（只在固定文本处使用）
     if lang == "en":
-        mapping = {
-            "贪吃蛇":"Snake",
-            "按 空格 / 回车 开始    Esc 退出":"Press Space/Enter to start    Esc to quit",
-            "方向键 或 WASD 控制移动":"Arrow keys or WASD to move",
-            "分数:":"Score:",
-            "游戏结束 - 按 R 重玩，Esc 退出":"Game Over - R to restart, Esc to quit",
-            "开始":"Start",
-            "设置":"Settings",
-            "退出":"Quit",
-            "语言":"Language",
-            "蛇颜色":"Snake Color",
-            "速度":"Speed",
-            "难度":"Difficulty",
-            "最大化适配":"Maximize adapt",
-            "开":"On",
-            "关":"Off",
-            "返回":"Back (Enter)"
-        }
-    else:
-        mapping = {k:k for k in [
-            "贪吃蛇","按 空格 / 回车 开始    Esc 退出","方向键 或 WASD 控制移动",
-            "分数:","游戏结束 - 按 R 重玩，Esc 退出",
-            "开始","设置","退出","语言","蛇颜色","速度","难度","最大化适配","开","关","返回"
-        ]}
-    return mapping.get(text, text)
-
-def game_loop():
-    global CELL_SIZE, WIDTH, HEIGHT
-    pygame.init()
+        return TRANSLATIONS_EN.get(text, text)
+    return text
+
+# 新增：文字 Surface 的 LRU 缓存，键为 (font, text, antialias, color)，即 font.render 的参数；
+# 返回的 Surface 被多处共享，只能 blit，不要修改
+TEXT_CACHE_SIZE = 256
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_cached(font, text, antialias, color):
+    return font.render(text, antialias, color)
+
+# 语言或字体变化时清空缓存
+def clear_text_cache():
+    render_cached.cache_clear()
+
+# 新增：一次性初始化（窗口与字体），重玩时不再重复执行
+def init_game():
+    # 只初始化用到的模块，跳过音频等
+    pygame.display.init()
     pygame.font.init()
+    mark_startup("pygame_init")
 
     flags = pygame.RESIZABLE
-    screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+    pygame.display.set_mode((WIDTH, HEIGHT), flags)
     pygame.display.set_caption("贪吃蛇")
-    clock = pygame.time.Clock()
+    mark_startup("set_mode")
 
     # 使用可用的中文字体（若找不到再使用默认字体）
-    font_path = find_chinese_font()
-    if font_path:
-        font = pygame.font.Font(font_path, FONT_SZ)
-    else:
-        font = pygame.font.Font(None, FONT_SZ)
+    font_path = get_font_path()
+    font = pygame.font.Font(font_path, FONT_SZ)
+    title_font = pygame.font.Font(font_path, FONT_SZ + 12)
+    small_font = pygame.font.Font(font_path, max(12, FONT_SZ - 6))
+    clear_text_cache()  # 字体对象已重建
+    mark_startup("fonts")
+    return font, title_font, small_font
 
-    title_font = pygame.font.Font(font_path if font_path else None, FONT_SZ + 12)
-    small_font = pygame.font.Font(font_path if font_path else None, max(12, FONT_SZ - 6))
+def game_loop(fonts, replay=None, autopilot=False):
+    # replay 不为 None 时跳过菜单，在窗口中播放该录像；autopilot 为 True 时跳过菜单，由自动驾驶控制并自动重开
+    font, title_font, small_font = fonts
+    screen = pygame.display.get_surface()
+    clock = pygame.time.Clock()
 
     # 初始化偏移与窗口大小跟踪
     win_w, win_h = screen.get_size()
-    CELL_SIZE = max(4, min(win_w // GRID_W, win_h // GRID_H))
-    update_dimensions_from_cell()
-    update_offsets(win_w, win_h)
-    prev_size = (win_w, win_h)
+    fit_board(win_w, win_h)
 
     # --- 主开始菜单（含“设置”选项） ---
     menu_items = ["start", "settings", "quit"]
     menu_idx = 0
-    in_menu = True
+    in_menu = replay is None and not autopilot
     pygame.mouse.set_visible(True)
 
+    dirty = True  # 新增：菜单只在输入、窗口变化或从设置返回后重画，其余时间阻塞等待事件
     while in_menu:
-        # 获取当前窗口尺寸 / 计算布局
-        win_w, win_h = screen.get_size()
-        center_x, center_y = win_w // 2, win_h // 2
-
-        # 生成渲染文字与可点击区域（每帧刷新，保证响应窗口尺寸变化）
-        item_labels = [
-            render_text(font, "开始", settings["lang"]),
-            render_text(font, "设置", settings["lang"]),
-            render_text(font, "退出", settings["lang"]),
-        ]
-        item_surfs = [small_font.render(lbl, True, WHITE) for lbl in item_labels]
-        item_rects = [s.get_rect(center=(center_x, center_y - 20 + i*32)) for i, s in enumerate(item_surfs)]
+        if dirty:
+            # 获取当前窗口尺寸 / 计算布局（设置界面里也可能改过窗口，重新取显示 Surface）
+            screen = pygame.display.get_surface()
+            win_w, win_h = screen.get_size()
+            center_x, center_y = win_w // 2, win_h // 2
 
-        for event in pygame.event.get():
+            # 生成渲染文字与可点击区域（每次重画时刷新，保证响应窗口尺寸变化）
+            item_labels = [
+                render_text(font, "开始", settings["lang"]),
+                render_text(font, "设置", settings["lang"]),
+                render_text(font, "退出", settings["lang"]),
+            ]
+            item_surfs = [render_cached(small_font, lbl, True, WHITE) for lbl in item_labels]
+            item_rects = [s.get_rect(center=(center_x, center_y - 20 + i*32)) for i, s in enumerate(item_surfs)]
+
+            # 绘制菜单（响应 hover / keyboard 高亮）
+            screen.fill(BLACK)
+            title_surf = render_cached(title_font, render_text(font, "贪吃蛇", settings["lang"]), True, WHITE)
+            screen.blit(title_surf, title_surf.get_rect(center=(center_x, center_y - 80)))
+
+            for i, surf in enumerate(item_surfs):
+                color = WHITE if i == menu_idx else (160,160,160)
+                # 重新渲染带颜色文本，保证高亮色正确
+                surf = render_cached(small_font, item_labels[i], True, color)
+                rect = surf.get_rect(center=(center_x, center_y - 20 + i*32))
+                screen.blit(surf, rect)
+
+            pygame.display.flip()
+            dirty = False
+            if startup_marks is not None:
+                report_startup()
+
+        for event in wait_events():
             if event.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
             elif event.type == pygame.VIDEORESIZE:
-                # 菜单响应窗口大小变化
-                win_w, win_h = event.w, event.h
-                screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
-                CELL_SIZE = max(4, min(win_w // GRID_W, win_h // GRID_H))
-                update_dimensions_from_cell()
-                update_offsets(win_w, win_h)
+                note_resize(event)
+            elif event.type in EXPOSE_EVENTS:
+                dirty = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     pygame.quit(); sys.exit()
                 elif event.key in (pygame.K_UP,):
                     menu_idx = (menu_idx - 1) % len(menu_items)
+                    dirty = True
                 elif event.key in (pygame.K_DOWN,):
                     menu_idx = (menu_idx + 1) % len(menu_items)
+                    dirty = True
                 elif event.key in (pygame.K_RETURN, pygame.K_SPACE):
                     choice = menu_items[menu_idx]
                     if choice == "start":
@@ -190,6 +547,7 @@ def game_loop():
                         pygame.quit(); sys.exit()
                     elif choice == "settings":
                         open_settings(screen, title_font, small_font)
+                        dirty = True
             elif event.type == pygame.MOUSEMOTION:
                 mx, my = event.pos
                 # hover 影响高亮
@@ -198,8 +556,9 @@ def game_loop():
                     if rect.collidepoint(mx, my):
                         hover_idx = i
                         break
-                if hover_idx is not None:
+                if hover_idx is not None and hover_idx != menu_idx:
                     menu_idx = hover_idx
+                    dirty = True
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 mx, my = event.pos
                 for i, rect in enumerate(item_rects):
@@ -211,22 +570,10 @@ def game_loop():
                             pygame.quit(); sys.exit()
                         elif choice == "settings":
                             open_settings(screen, title_font, small_font)
+                            dirty = True
                         break
-
-        # 绘制菜单（响应 hover / keyboard 高亮）
-        screen.fill(BLACK)
-        title_surf = title_font.render(render_text(font, "贪吃蛇", settings["lang"]), True, WHITE)
-        screen.blit(title_surf, title_surf.get_rect(center=(center_x, center_y - 80)))
-
-        for i, surf in enumerate(item_surfs):
-            color = WHITE if i == menu_idx else (160,160,160)
-            # 重新渲染带颜色文本，保证高亮色正确
-            surf = small_font.render(item_labels[i], True, color)
-            rect = surf.get_rect(center=(center_x, center_y - 20 + i*32))
-            screen.blit(surf, rect)
-
-        pygame.display.flip()
-        clock.tick(30)
+        if settle_resize():
+            dirty = True
     # --- 菜单结束，进入游戏 ---
 
     # 应用设置
@@ -234,103 +581,276 @@ def game_loop():
     base_speed = SPEED_OPTIONS[settings["speed_idx"]][1]
     difficulty = DIFFICULTY_OPTIONS[settings["difficulty_idx"]][1]
 
-    # 初始蛇和食物（head first，身体在 head 的下方，配合初始方向 (0,-1) 向上）
-    snake = [(GRID_W//2, GRID_H//2 + i) for i in range(3)]  # head first
-    direction = (0, -1)  # 上
-    food = random_food(snake)
-    score = 0
-    alive = True
+    # 规则由 SnakeEngine 负责，这里只处理输入与绘制
+    player = recorder = pilot = None
+    if replay is not None:
+        base_speed, difficulty = replay.base_speed, replay.difficulty
+        player = ReplayPlayer(replay)
+        state = player.state
+    else:
+        seed = random.randrange(2**32)
+        engine = SnakeEngine(GRID_W, GRID_H, difficulty)
+        state = engine.reset(seed)
+        recorder = ReplayRecorder(GRID_W, GRID_H, difficulty, base_speed, seed)
+        if autopilot:
+            pilot = get_autopilot(difficulty)
+    over_wait = 0.0      # 自动驾驶模式下结束后已等待的秒数
+    turns = deque()      # 待执行的转向，每个模拟 tick 取一个
+    accumulator = 0.0    # 固定步长累加器（秒）
+    last_move = None     # 最近一个 tick 的 (旧头, 释放的旧尾或 None)，用于插值
+    motion = None
+
+    head_color = tuple(max(0, c-40) for c in snake_color)  # 头颜色稍深
+    wrap = difficulty == "wrap"
+    follow_camera(state.snake[0], wrap, center=True)
+    grid_layer = get_grid_layer(screen.get_size())
+    full_redraw = True
+    score_label = render_text(font, "分数:", settings["lang"])
+    score_surf = render_cached(font, f"{score_label} {state.score}", True, WHITE)
+    score_rect = score_surf.get_rect(topleft=(8, 8))
+    over = None          # 结束提示 (Surface, Rect)
+    finished = False     # 本局已结束；回放的 tick 用完时蛇可能还活着，所以不能只看 state.alive
+    pilot_info = None    # 自动驾驶模式下结束时显示的决策耗时 (Surface, Rect)
+    overlay_rect = None  # 上一帧分析器叠加层的位置
+    clock.tick()
 
     while True:
-        for event in pygame.event.get():
+        # 绘制与输入按显示帧率运行；模拟按设置速度（随得分加快）以固定步长推进
+        dt = clock.tick(DISPLAY_FPS) / 1000.0
+        profiler.begin(dt)
+
+        if not finished or full_redraw or profiler.overlay:
+            events = pygame.event.get()
+        else:
+            # 结束画面静止不动：阻塞等待按键；自动驾驶模式最多等到自动重开的时刻
+            timeout = IDLE_WAIT_MS if pilot is None else max(1, int((AUTOPILOT_RESTART_DELAY - over_wait) * 1000))
+            events = wait_events(timeout)
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
 
-            # 窗口调整/最大化事件：重新计算 CELL_SIZE 与画布尺寸
+            if event.type in EXPOSE_EVENTS:
+                full_redraw = True
+
+            # 窗口调整/最大化事件：只记下尺寸，静止后由 settle_resize() 统一重建
             if event.type == pygame.VIDEORESIZE:
-                win_w, win_h = event.w, event.h
-                screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
-                CELL_SIZE = max(4, min(win_w // GRID_W, win_h // GRID_H))
-                update_dimensions_from_cell()
-                update_offsets(win_w, win_h)
-                prev_size = (win_w, win_h)
+                note_resize(event)
 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     pygame.quit(); sys.exit()
-                if alive:
-                    if event.key in (pygame.K_w, pygame.K_UP) and direction != (0, 1):
-                        direction = (0, -1)
-                    elif event.key in (pygame.K_s, pygame.K_DOWN) and direction != (0, -1):
-                        direction = (0, 1)
-                    elif event.key in (pygame.K_a, pygame.K_LEFT) and direction != (1, 0):
-                        direction = (-1, 0)
-                    elif event.key in (pygame.K_d, pygame.K_RIGHT) and direction != (-1, 0):
-                        direction = (1, 0)
+                if event.key == pygame.K_F3:
+                    profiler.toggle_overlay()
+                elif not finished:
+                    if event.key in KEY_ACTIONS and len(turns) < TURN_BUFFER:
+                        # 与缓冲中最后一次转向比较，忽略重复与反向
+                        action = KEY_ACTIONS[event.key]
+                        last = turns[-1] if turns else state.direction
+                        if action != last and action != (last + 2) % 4:
+                            turns.append(action)
                 else:
                     if event.key == pygame.K_r:
                         return  # 结束当前循环以重启游戏
 
-        if alive:
-            # 移动（依据难度决定是否包裹）
-            head = snake[0]
-            new_x = head[0] + direction[0]
-            new_y = head[1] + direction[1]
-            if difficulty == "wrap":
-                new_head = (new_x % GRID_W, new_y % GRID_H)
-            else:
-                # 碰到边界即死亡
-                if not (0 <= new_x < GRID_W and 0 <= new_y < GRID_H):
-                    alive = False
-                    new_head = (new_x, new_y)
-                else:
-                    new_head = (new_x, new_y)
+        if settle_resize():
+            screen = pygame.display.get_surface()
+            follow_camera(state.snake[0], wrap)
+            grid_layer = get_grid_layer(screen.get_size())
+            full_redraw = True
 
-            # 撞到自己判断
-            if new_head in snake:
-                alive = False
-            else:
-                snake.insert(0, new_head)
-                if new_head == food:
-                    score += 1
-                    food = random_food(snake)
+        profiler.mark("events")
+
+        # 每 tick 只有旧头（变成身体色）、旧尾、新头和食物会变化；插值期间还要重画头尾所在格子
+        dirty_cells = set()
+        dirty_rects = []
+        if not finished:
+            if motion is not None:
+                dirty_cells.update(motion_cells(state, motion))
+            accumulator += dt
+            tick_dt = 1.0 / min(60, base_speed + state.score // 3)
+            steps = 0
+            while accumulator >= tick_dt and steps < MAX_TICKS_PER_FRAME:
+                prev_head, prev_tail, prev_food, prev_score = state.snake[0], state.snake[-1], state.food, state.score
+                if player is not None:
+                    state = player.step()
+                    done = player.done
                 else:
-                    snake.pop()
+                    if pilot is not None:
+                        action = pilot.decide(state)
+                    else:
+                        action = turns.popleft() if turns else None
+                    state, _, done = engine.step(action)
+                    recorder.record(state)
+                    if done:
+                        save_replay(recorder)
+                        if pilot is not None:
+                            st = pilot.stats()
+                            info = (f"p50 {st['p50_us']:.1f} us  p99 {st['p99_us']:.1f} us  "
+                                    f"max {st['max_us']:.1f} us")
+                            info_surf = small_font.render(info, True, WHITE)
+                            pilot_info = (info_surf, info_surf.get_rect(center=(WIDTH//2, HEIGHT//2 + FONT_SZ)))
+                accumulator -= tick_dt
+                steps += 1
+                if follow_camera(state.snake[0], wrap):
+                    full_redraw = True  # 视口滚动，整个视口重画（开销只与视口大小有关）
+                if done:
+                    finished = True
+                    full_redraw = True  # 结束提示需要整屏绘制一次
+                    last_move = None
+                    over_text = "你赢了 - 按 R 重玩，Esc 退出" if state.won else "游戏结束 - 按 R 重玩，Esc 退出"
+                    over_surf = render_cached(font, render_text(font, over_text, settings["lang"]), True, WHITE)
+                    over = (over_surf, over_surf.get_rect(center=(WIDTH//2, HEIGHT//2)))
+                    break
+                grew = state.score != prev_score
+                last_move = (prev_head, None if grew else prev_tail)
+                dirty_cells.update((prev_head, prev_tail, prev_food, state.snake[0], state.food))
+                if grew:
+                    # 分数变化才重新渲染 HUD
+                    dirty_rects.append(score_rect)
+                    score_surf = render_cached(font, f"{score_label} {state.score}", True, WHITE)
+                    score_rect = score_surf.get_rect(topleft=(8, 8))
+                    dirty_rects.append(score_rect)
+                    tick_dt = 1.0 / min(60, base_speed + state.score // 3)
+            if steps == MAX_TICKS_PER_FRAME:
+                accumulator = 0.0  # 卡顿过久时丢弃积压，避免越追越慢
+            if last_move is not None and not finished:
+                motion = (last_move[0], last_move[1], min(1.0, accumulator / tick_dt))
+                dirty_cells.update(motion_cells(state, motion))
+            else:
+                motion = None
+        elif pilot is not None:
+            over_wait += dt
+            if over_wait >= AUTOPILOT_RESTART_DELAY:
+                return  # 演示模式自动重开
+
+        profiler.mark("logic")
 
         # 绘制
-        screen.fill(BLACK)
-        draw_grid(screen)
-        # 食物
-        draw_cell(screen, food, RED)
-        # 蛇
-        for i, seg in enumerate(snake):
-            color = snake_color if i != 0 else tuple(max(0, c-40) for c in snake_color)  # 头颜色稍深
-            draw_cell(screen, seg, color)
-
-        # HUD
-        score_label = render_text(font, "分数:", settings["lang"])
-        score_surf = font.render(f"{score_label} {score}", True, WHITE)
-        screen.blit(score_surf, (8, 8))
-
-        if not alive:
-            over_label = render_text(font, "游戏结束 - 按 R 重玩，Esc 退出", settings["lang"])
-            over_surf = font.render(over_label, True, WHITE)
-            r = over_surf.get_rect(center=(WIDTH//2, HEIGHT//2))
-            screen.blit(over_surf, r)
+        hud = [(score_surf, score_rect)]
+        if over is not None:
+            hud.append(over)
+        if pilot_info is not None:
+            hud.append(pilot_info)
+        if full_redraw or RENDER_MODE == "full":
+            screen.blit(grid_layer, (0, 0))
+            profiler.mark("grid")
+            draw_board(screen, state, snake_color, head_color, motion)
+            profiler.mark("snake")
 
-        pygame.display.flip()
+            # HUD 与结束提示
+            for surf, r in hud:
+                screen.blit(surf, r)
+            profiler.mark("text")
+
+            overlay_rect = None
+            if profiler.overlay:
+                panel = profiler.overlay_surface(small_font)
+                overlay_rect = panel.get_rect(topright=(screen.get_width() - 8, 8))
+                screen.blit(panel, overlay_rect)
+            profiler.mark("overlay")
+
+            pygame.display.flip()
+            full_redraw = False
+            if startup_marks is not None:
+                report_startup()  # --autopilot / --replay 跳过菜单，首帧在这里
+        elif dirty_cells or dirty_rects or overlay_rect is not None or profiler.overlay:
+            dirty_rects += [cell_rect(c) for c in dirty_cells if c is not None]
+            for r in dirty_rects:
+                redraw_region(screen, grid_layer, r, state, snake_color, head_color, hud, motion)
+            profiler.mark("snake")
 
-        # 根据设置速度与得分动态设置帧率（以设置基础速度为基准）
-        local_fps = min(60, base_speed + score // 3)
-        clock.tick(local_fps)
+            # 叠加层：先用背景还原上一帧的位置，再画新的
+            if overlay_rect is not None:
+                redraw_region(screen, grid_layer, overlay_rect, state, snake_color, head_color, hud, motion)
+                dirty_rects.append(overlay_rect)
+                overlay_rect = None
+            if profiler.overlay:
+                panel = profiler.overlay_surface(small_font)
+                overlay_rect = panel.get_rect(topright=(screen.get_width() - 8, 8))
+                screen.blit(panel, overlay_rect)
+                dirty_rects.append(overlay_rect)
+            profiler.mark("overlay")
+
+            pygame.display.update(dirty_rects)
+        profiler.mark("present")
+        profiler.end()
+
+# 新增：联机模式。状态完全由服务器推送（快照 + 每 tick 增量），本地只发送转向并整屏绘制
+def net_loop(fonts, client):
+    global GRID_W, GRID_H
+    font, title_font, small_font = fonts
+    screen = pygame.display.get_surface()
+    clock = pygame.time.Clock()
+    snake_color = SNAKE_COLOR_OPTIONS[settings["snake_color_idx"]][1]
+    head_color = tuple(max(0, c-40) for c in snake_color)
+    other_color = (150, 150, 150)
+    view = client.state
+    layout = None      # 棋盘大小；变化或应用了新的窗口尺寸后重建背景层
+    grid_layer = None
+    shown_tick = None
+
+    while True:
+        clock.tick(DISPLAY_FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                client.close()
+                pygame.quit(); sys.exit()
+            elif event.type == pygame.VIDEORESIZE:
+                note_resize(event)
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    client.close()
+                    pygame.quit(); sys.exit()
+                if event.key in KEY_ACTIONS:
+                    client.send_direction(KEY_ACTIONS[event.key])  # 缓冲与反向过滤由服务器负责
+        if settle_resize():
+            screen = pygame.display.get_surface()
+            layout = None
+
+        client.poll()
+        if client.closed:
+            print(render_text(font, "连接已断开", settings["lang"]))
+            pygame.quit(); sys.exit()
+        if view.grid_w is None:
+            continue  # 还没收到快照
+        if layout != (view.grid_w, view.grid_h):
+            layout = (view.grid_w, view.grid_h)
+            GRID_W, GRID_H = view.grid_w, view.grid_h
+            fit_board(*screen.get_size())
+            grid_layer = get_grid_layer(screen.get_size())
+            shown_tick = None
+        if view.tick == shown_tick:
+            continue  # 画面只在服务器 tick 后变化
+        shown_tick = view.tick
+
+        me = view.snakes.get(view.you)
+        if me:
+            follow_camera(me[0], view.wrap)
+        screen.blit(grid_layer, (0, 0))
+        for f in view.food:
+            draw_cell(screen, f, RED)
+        for pid, body in view.snakes.items():
+            color = snake_color if pid == view.you else other_color
+            for seg in body:
+                draw_cell(screen, seg, color)
+            if pid == view.you:
+                draw_cell(screen, body[0], head_color)
+
+        hud = f"{render_text(font, '分数:', settings['lang'])} {view.scores.get(view.you, 0)}   " \
+              f"{render_text(font, '玩家:', settings['lang'])} {len(view.scores)}"
+        screen.blit(render_cached(font, hud, True, WHITE), (8, 8))
+        if not me:
+            tip = render_cached(font, render_text(font, "等待重生…", settings["lang"]), True, WHITE)
+            screen.blit(tip, tip.get_rect(center=(screen.get_width()//2, screen.get_height()//2)))
+        pygame.display.flip()
+        if startup_marks is not None:
+            report_startup()
 
 # 新增：设置界面函数（移除 最大化 选项）
 def open_settings(screen, title_font, small_font):
-    global CELL_SIZE, WIDTH, HEIGHT
     option_keys = ["lang", "snake_color_idx", "speed_idx", "difficulty_idx"]
     idx = 0
     running = True
-    clock = pygame.time.Clock()
 
     # 英文备用标签（用于 settings["lang"] == 'en' 时显示）
     SNAKE_COLOR_LABELS_EN = ["Green", "Blue", "Yellow", "Purple"]
@@ -343,48 +863,72 @@ def open_settings(screen, title_font, small_font):
         else:
             return "中文" if code == "zh" else "English"
 
+    shown_lang = settings["lang"]
+    dirty = True  # 新增：只在输入、窗口变化或设置改变后重画，其余时间阻塞等待事件
     while running:
-        win_w, win_h = screen.get_size()
-        center_x, center_y = win_w // 2, win_h // 2
-
-        # 构造显示文本（根据当前语言翻译标签）
-        label_lang = render_text(small_font, "语言", settings["lang"])
-        label_color = render_text(small_font, "蛇颜色", settings["lang"])
-        label_speed = render_text(small_font, "速度", settings["lang"])
-        label_diff = render_text(small_font, "难度", settings["lang"])
-        label_back = render_text(small_font, "返回", settings["lang"])
-
-        # 值文本（根据语言环境选择中/英文显示）
-        cur_lang = settings["lang"]
-        val_lang = get_lang_label(LANG_OPTIONS[settings["lang"] == "zh" and 0 or 1][1], cur_lang)  # placeholder safe path
-        # 更稳的取值：用 settings["lang"] 本身作为当前语言 code；显示当前选择对应名称
-        # 生成每项可显示值（语言项特别处理）
-        lang_display = get_lang_label(LANG_OPTIONS[0][1], cur_lang) if settings["lang"] == LANG_OPTIONS[0][1] else get_lang_label(LANG_OPTIONS[1][1], cur_lang)
-        color_display = (SNAKE_COLOR_OPTIONS[settings["snake_color_idx"]][0]
-                         if cur_lang == "zh" else SNAKE_COLOR_LABELS_EN[settings["snake_color_idx"]])
-        speed_display = (SPEED_OPTIONS[settings["speed_idx"]][0]
-                         if cur_lang == "zh" else SPEED_LABELS_EN[settings["speed_idx"]])
-        diff_display = (DIFFICULTY_OPTIONS[settings["difficulty_idx"]][0]
-                        if cur_lang == "zh" else DIFFICULTY_LABELS_EN[settings["difficulty_idx"]])
-
-        # 渲染项和位置
-        labels = [label_lang, label_color, label_speed, label_diff]
-        values = [lang_display, color_display, speed_display, diff_display]
-        item_surfs = [small_font.render(l, True, WHITE) for l in labels]
-        value_surfs = [small_font.render(v, True, WHITE) for v in values]
-        item_rects = [s.get_rect(topleft=(center_x - 160, 140 + i*40)) for i, s in enumerate(item_surfs)]
-        value_rects = [vs.get_rect(topleft=(center_x + 20, 140 + i*40)) for i, vs in enumerate(value_surfs)]
+        if dirty:
+            win_w, win_h = screen.get_size()
+            center_x, center_y = win_w // 2, win_h // 2
 
-        for event in pygame.event.get():
+            # 构造显示文本（根据当前语言翻译标签）
+            label_lang = render_text(small_font, "语言", settings["lang"])
+            label_color = render_text(small_font, "蛇颜色", settings["lang"])
+            label_speed = render_text(small_font, "速度", settings["lang"])
+            label_diff = render_text(small_font, "难度", settings["lang"])
+            label_back = render_text(small_font, "返回", settings["lang"])
+
+            # 值文本（根据语言环境选择中/英文显示）
+            cur_lang = settings["lang"]
+            val_lang = get_lang_label(LANG_OPTIONS[settings["lang"] == "zh" and 0 or 1][1], cur_lang)  # placeholder safe path
+            # 更稳的取值：用 settings["lang"] 本身作为当前语言 code；显示当前选择对应名称
+            # 生成每项可显示值（语言项特别处理）
+            lang_display = get_lang_label(LANG_OPTIONS[0][1], cur_lang) if settings["lang"] == LANG_OPTIONS[0][1] else get_lang_label(LANG_OPTIONS[1][1], cur_lang)
+            color_display = (SNAKE_COLOR_OPTIONS[settings["snake_color_idx"]][0]
+                             if cur_lang == "zh" else SNAKE_COLOR_LABELS_EN[settings["snake_color_idx"]])
+            speed_display = (SPEED_OPTIONS[settings["speed_idx"]][0]
+                             if cur_lang == "zh" else SPEED_LABELS_EN[settings["speed_idx"]])
+            diff_display = (DIFFICULTY_OPTIONS[settings["difficulty_idx"]][0]
+                            if cur_lang == "zh" else DIFFICULTY_LABELS_EN[settings["difficulty_idx"]])
+
+            # 渲染项和位置
+            labels = [label_lang, label_color, label_speed, label_diff]
+            values = [lang_display, color_display, speed_display, diff_display]
+            item_surfs = [render_cached(small_font, l, True, WHITE) for l in labels]
+            value_surfs = [render_cached(small_font, v, True, WHITE) for v in values]
+            item_rects = [s.get_rect(topleft=(center_x - 160, 140 + i*40)) for i, s in enumerate(item_surfs)]
+            value_rects = [vs.get_rect(topleft=(center_x + 20, 140 + i*40)) for i, vs in enumerate(value_surfs)]
+
+            # 绘制设置界面
+            screen.fill(BLACK)
+            title_surf = render_cached(title_font, render_text(small_font, "设置", settings["lang"]), True, WHITE)
+            screen.blit(title_surf, title_surf.get_rect(center=(center_x, 60)))
+
+            for i, (lab_surf, val_surf) in enumerate(zip(item_surfs, value_surfs)):
+                color = WHITE if i == idx else (180,180,180)
+                # 重新渲染以反映高亮
+                ks = render_cached(small_font, labels[i], True, color)
+                vs = render_cached(small_font, values[i], True, color)
+                screen.blit(ks, (center_x - 160, 140 + i*40))
+                screen.blit(vs, (center_x + 20, 140 + i*40))
+                # 可视化提示：小三角指示当前项
+                if i == idx:
+                    pygame.draw.polygon(screen, color, [(center_x - 180, 140 + i*40 + 8), (center_x - 170, 140 + i*40 + 4), (center_x - 170, 140 + i*40 + 12)])
+
+            hint = render_cached(small_font, label_back, True, (140,140,140))
+            screen.blit(hint, hint.get_rect(center=(center_x, win_h - 40)))
+
+            pygame.display.flip()
+            dirty = False
+
+        for event in wait_events():
             if event.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
             elif event.type == pygame.VIDEORESIZE:
-                win_w, win_h = event.w, event.h
-                screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
-                CELL_SIZE = max(4, min(win_w // GRID_W, win_h // GRID_H))
-                update_dimensions_from_cell()
-                update_offsets(win_w, win_h)
+                note_resize(event)
+            elif event.type in EXPOSE_EVENTS:
+                dirty = True
             elif event.type == pygame.KEYDOWN:
+                dirty = True
                 if event.key == pygame.K_ESCAPE:
                     running = False
                 elif event.key in (pygame.K_UP,):
@@ -420,9 +964,11 @@ def open_settings(screen, title_font, small_font):
                     if rect.collidepoint(mx, my) or value_rects[i].collidepoint(mx, my):
                         hover = i
                         break
-                if hover is not None:
+                if hover is not None and hover != idx:
                     idx = hover
+                    dirty = True
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                dirty = True
                 mx, my = event.pos
                 # 左键：下一个；右键：上一个
                 for i, rect in enumerate(value_rects):
@@ -448,35 +994,66 @@ def open_settings(screen, title_font, small_font):
                                 settings["difficulty_idx"] = (settings["difficulty_idx"] - 1) % len(DIFFICULTY_OPTIONS)
                         break
                 # 点击“返回”区域也可回到主菜单（在窗口底部）
-                back_rect = small_font.render(label_back, True, WHITE).get_rect(center=(center_x, win_h - 40))
+                back_rect = render_cached(small_font, label_back, True, WHITE).get_rect(center=(center_x, win_h - 40))
                 if back_rect.collidepoint(mx, my) and event.button == 1:
                     running = False
+        if settle_resize():
+            screen = pygame.display.get_surface()
+            dirty = True
 
-        # 绘制设置界面
-        screen.fill(BLACK)
-        title_surf = title_font.render(render_text(small_font, "设置", settings["lang"]), True, WHITE)
-        screen.blit(title_surf, title_surf.get_rect(center=(center_x, 60)))
-
-        for i, (lab_surf, val_surf) in enumerate(zip(item_surfs, value_surfs)):
-            color = WHITE if i == idx else (180,180,180)
-            # 重新渲染以反映高亮
-            ks = small_font.render(labels[i], True, color)
-            vs = small_font.render(values[i], True, color)
-            screen.blit(ks, (center_x - 160, 140 + i*40))
-            screen.blit(vs, (center_x + 20, 140 + i*40))
-            # 可视化提示：小三角指示当前项
-            if i == idx:
-                pygame.draw.polygon(screen, color, [(center_x - 180, 140 + i*40 + 8), (center_x - 170, 140 + i*40 + 4), (center_x - 170, 140 + i*40 + 12)])
-
-        hint = small_font.render(label_back, True, (140,140,140))
-        screen.blit(hint, hint.get_rect(center=(center_x, win_h - 40)))
-
-        pygame.display.flip()
-        clock.tick(30)
+        # 语言切换后旧语言的文字缓存不再需要
+        if settings["lang"] != shown_lang:
+            shown_lang = settings["lang"]
+            clear_text_cache()
 
 def main():
+    global startup_marks, GRID_W, GRID_H
+    parser = argparse.ArgumentParser(description="贪吃蛇")
+    parser.add_argument("--startup-time", action="store_true", help="测量启动到首帧的耗时后退出")
+    parser.add_argument("--replay", metavar="FILE", help="在窗口中播放录像（R 重播，Esc 退出）")
+    parser.add_argument("--profile", metavar="FILE", help="逐帧导出各阶段耗时（.csv 或 .jsonl）")
+    parser.add_argument("--autopilot", action="store_true", help="自动驾驶演示模式：跳过菜单并在结束后自动重开")
+    parser.add_argument("--grid", help="棋盘大小，如 2000x2000；放不下窗口时视口跟随蛇头")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="连接联机服务器（见 snake_net.py）")
+    parser.add_argument("--room", default="lobby", help="联机房间名")
+    args = parser.parse_args()
+    if args.profile:
+        profiler.open_export(args.profile)
+    if args.startup_time:
+        startup_marks = {}
+        mark_startup("import")
+
+    if args.grid:
+        try:
+            GRID_W, GRID_H = (int(v) for v in args.grid.lower().split("x"))
+        except ValueError:
+            parser.error(f"invalid --grid: {args.grid}")
+        if GRID_W < 1 or GRID_H < 5:
+            parser.error(f"grid too small: {args.grid}")
+
+    replay = None
+    if args.replay:
+        try:
+            replay = Replay.load(args.replay)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load replay {args.replay}: {e}")
+        GRID_W, GRID_H = replay.grid_w, replay.grid_h
+
+    client = None
+    if args.connect:
+        # 联机模块会引入 asyncio，只在联机时导入，不拖慢单机启动
+        from snake_net import NetClient, parse_address
+        host, port = parse_address(args.connect)
+        try:
+            client = NetClient(host, port, args.room)
+        except OSError as e:
+            parser.error(f"cannot connect to {args.connect}: {e}")
+
+    fonts = init_game()
+    if client is not None:
+        net_loop(fonts, client)
     while True:
-        game_loop()
+        game_loop(fonts, replay, args.autopilot)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
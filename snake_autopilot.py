@@ -0,0 +1,231 @@
+import sys
+import time
+import argparse
+from array import array
+from collections import deque
+
+from snake_engine import SnakeEngine, GRID_W, GRID_H, DIRECTIONS
+
+# 自动驾驶：BFS 求到食物的最短路并跨 tick 复用，每一步都用哈密顿回路规则校验安全性，
+# 不安全时退回沿回路走（或在回路上做安全的捷径）。
+# 所有搜索缓冲在构造时一次分配，之后每次决策只做原地写入。
+
+
+def hamiltonian_cycle(w, h):
+    # 返回覆盖全部格子的回路 [(x, y), ...]；宽高都为奇数时不存在，返回 None
+    if h % 2 == 0:
+        # 第 0 行向右，其余行在 1..w-1 列之间蛇形往返，最后沿第 0 列回到起点
+        cells = [(x, 0) for x in range(w)]
+        for y in range(1, h):
+            xs = range(w - 1, 0, -1) if y % 2 == 1 else range(1, w)
+            cells += [(x, y) for x in xs]
+        cells += [(0, y) for y in range(h - 1, 0, -1)]
+        return cells
+    if w % 2 == 0:
+        return [(x, y) for y, x in hamiltonian_cycle(h, w)]
+    return None
+
+
+class Autopilot:
+    def __init__(self, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap", latency_window=1000):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        n = grid_w * grid_h
+        self.cells = n
+
+        # 邻接表：neighbors[4*c+d] 为格子 c 沿方向 d 的邻格，撞墙为 -1
+        nb = array("i", [-1]) * (4 * n)
+        for c in range(n):
+            x, y = c % grid_w, c // grid_w
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = x + dx, y + dy
+                if difficulty == "wrap":
+                    nx %= grid_w
+                    ny %= grid_h
+                elif not (0 <= nx < grid_w and 0 <= ny < grid_h):
+                    continue
+                nb[4 * c + d] = ny * grid_w + nx
+        self.neighbors = nb
+        # BFS 内层循环用的紧凑邻格元组（去掉 -1），比按下标取 array 更快
+        self.adjacent = [tuple(m for m in nb[4 * c:4 * c + 4] if m >= 0) for c in range(n)]
+
+        # 搜索缓冲：stamp 用代号代替每次清零
+        self.parent = array("i", [0]) * n
+        self.stamp = array("I", [0]) * n
+        self.queue = array("i", [0]) * n
+        self.gen = 0
+
+        # 哈密顿回路：cycle_pos[c] 为格子在回路中的序号
+        cycle = hamiltonian_cycle(grid_w, grid_h)
+        if cycle is None:
+            self.cycle_pos = None
+        else:
+            self.cycle_pos = array("i", [0]) * n
+            for i, (x, y) in enumerate(cycle):
+                self.cycle_pos[y * grid_w + x] = i
+
+        # 复用的路径：path[path_i:] 为从下一步到食物的格子
+        self.path = []
+        self.path_i = 0
+        self.path_food = -1
+
+        self.latency = deque(maxlen=latency_window)  # 最近每次决策耗时（秒）
+
+    def reset(self):
+        self.path = []
+        self.path_i = 0
+        self.path_food = -1
+
+    def _bfs(self, occ, start, goal, tail):
+        # goal 为 -1 时遍历整个连通区域，返回可达格子数；否则返回到 goal 的路径（不含起点）或 None
+        self.gen += 1
+        gen = self.gen
+        stamp, parent, queue, adjacent = self.stamp, self.parent, self.queue, self.adjacent
+        stamp[start] = gen
+        # 尾巴格子视为可走（它会在同一 tick 移走）
+        queue[0] = start
+        qh, qt = 0, 1
+        found = False
+        while qh < qt:
+            c = queue[qh]
+            qh += 1
+            if c == goal:
+                found = True
+                break
+            for m in adjacent[c]:
+                if stamp[m] != gen and (not occ[m] or m == tail):
+                    stamp[m] = gen
+                    parent[m] = c
+                    queue[qt] = m
+                    qt += 1
+        if goal < 0:
+            return qt
+        if not found:
+            return None
+        path = []
+        c = goal
+        while c != start:
+            path.append(c)
+            c = parent[c]
+        path.reverse()
+        return path
+
+    def _cycle_dist(self, a, b):
+        return (self.cycle_pos[b] - self.cycle_pos[a]) % self.cells
+
+    def decide(self, state):
+        t0 = time.perf_counter()
+        action = self._decide(state)
+        self.latency.append(time.perf_counter() - t0)
+        return action
+
+    def _decide(self, state):
+        w, occ, nb = self.grid_w, state.occ, self.neighbors
+        hx, hy = state.snake[0]
+        tx, ty = state.snake[-1]
+        head, tail = hy * w + hx, ty * w + tx
+        food = -1 if state.food is None else state.food[1] * w + state.food[0]
+
+        if self.cycle_pos is not None:
+            # 回路规则：蛇身都位于回路上“尾 -> 头”一段时，头只要落在头与尾之间的空段内就不会被困住；
+            # allow 为允许跳过的回路步数，蛇身过半后不再抄近路，只沿回路走，也就不必搜索
+            length = len(state.snake)
+            free = self.cells - length
+            d_tail = self._cycle_dist(head, tail)
+            d_food = self._cycle_dist(head, food) if food >= 0 else self.cells
+            allow = 0 if free < self.cells // 2 else max(0, d_tail - length - 3)
+            if allow <= 1:
+                for d in range(4):
+                    m = nb[4 * head + d]
+                    if m >= 0 and self._cycle_dist(head, m) == 1 and (not occ[m] or m == tail):
+                        self.path = []
+                        return d
+
+        # 食物变了、或上次的路径已被挡住/偏离，才重新搜索
+        path = self.path
+        i = self.path_i
+        if food != self.path_food or i >= len(path) or (occ[path[i]] and path[i] != tail):
+            path = self._bfs(occ, head, food, tail) if food >= 0 else None
+            self.path = path or []
+            self.path_i = i = 0
+            self.path_food = food
+        hint = path[i] if path else -1
+
+        choice = -1
+        if self.cycle_pos is not None:
+            best_k = 0
+            for d in range(4):
+                m = nb[4 * head + d]
+                if m < 0 or (occ[m] and m != tail):
+                    continue
+                k = self._cycle_dist(head, m)
+                if k == 0 or (k > 1 and (k > allow or k > d_food)):
+                    continue
+                if m == hint:
+                    choice = m
+                    break
+                if k > best_k:
+                    best_k, choice = k, m
+        if choice < 0:
+            # 没有回路或回路规则下无路可走：跟随 BFS 路径，否则选可达区域最大的邻格
+            if hint >= 0:
+                choice = hint
+            else:
+                best_area = -1
+                for d in range(4):
+                    m = nb[4 * head + d]
+                    if m < 0 or (occ[m] and m != tail):
+                        continue
+                    area = self._bfs(occ, m, -1, tail)
+                    if area > best_area:
+                        best_area, choice = area, m
+        if choice < 0:
+            return state.direction  # 无路可走
+
+        if choice == hint:
+            self.path_i = i + 1
+        else:
+            self.path = []  # 偏离了路径，下次重新搜索
+        for d in range(4):
+            if nb[4 * head + d] == choice:
+                return d
+        return state.direction
+
+    def stats(self):
+        # 决策耗时统计（微秒）
+        if not self.latency:
+            return None
+        v = sorted(self.latency)
+        pick = lambda p: v[min(len(v) - 1, int(p / 100.0 * (len(v) - 1) + 0.5))] * 1e6
+        return {"decisions": len(v), "p50_us": pick(50), "p99_us": pick(99), "max_us": v[-1] * 1e6}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面运行自动驾驶并报告分数与决策耗时")
+    parser.add_argument("--grid", default=f"{GRID_W}x{GRID_H}", help="棋盘大小，如 30x20")
+    parser.add_argument("--difficulty", choices=("wrap", "wall"), default="wall")
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--max-ticks", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    w, h = (int(v) for v in args.grid.lower().split("x"))
+
+    engine = SnakeEngine(w, h, args.difficulty)
+    pilot = Autopilot(w, h, args.difficulty, latency_window=args.max_ticks)
+    for g in range(args.games):
+        state = engine.reset(args.seed + g)
+        pilot.reset()
+        done = False
+        while not done and state.ticks < args.max_ticks:
+            state, _, done = engine.step(pilot.decide(state))
+        result = "won" if state.won else (state.death or "timeout")
+        print(f"game {g}: score={state.score} length={len(state.snake)} ticks={state.ticks} result={result}")
+    st = pilot.stats()
+    if st:
+        print(f"decision latency: p50 {st['p50_us']:.1f} us, p99 {st['p99_us']:.1f} us, max {st['max_us']:.1f} us "
+              f"over last {st['decisions']} decisions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import math
+import random
+import argparse
+import itertools
+import multiprocessing
+from array import array
+
+from snake_engine import SnakeEngine, GRID_W, GRID_H, DIRECTIONS
+from snake_autopilot import Autopilot
+
+# 批量对局 / 锦标赛：把无界面对局分块分发到进程池，按（策略 × 难度 × 基础速度）汇总统计
+# 每局的种子只由 --seed 与对局序号决定，与进程数和调度顺序无关，结果可复现
+# 用法：python snake_batch.py --games 100000 --policy greedy,autopilot --difficulty wrap,wall
+
+DEATH_CODES = {None: 0, "wall": 1, "self": 2, "win": 3}
+DEATH_NAMES = ["timeout", "wall", "self", "win"]
+CHUNK_GAMES = 64  # 每个任务的对局数；结果按块以紧凑数组传回
+
+
+class RandomPolicy:
+    def __init__(self, grid_w, grid_h, difficulty, rng):
+        self.rng = rng
+
+    def reset(self):
+        pass
+
+    def decide(self, state):
+        return self.rng.randrange(4)
+
+
+class GreedyPolicy:
+    # 朝食物方向走，避开下一步就会撞上的格子
+    def __init__(self, grid_w, grid_h, difficulty, rng):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.wrap = difficulty == "wrap"
+
+    def reset(self):
+        pass
+
+    def decide(self, state):
+        w, h, occ = self.grid_w, self.grid_h, state.occ
+        hx, hy = state.snake[0]
+        fx, fy = state.food if state.food is not None else (hx, hy)
+        tail = state.snake[-1]
+        best, best_d = state.direction, None
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            if d == (state.direction + 2) % 4:
+                continue
+            nx, ny = hx + dx, hy + dy
+            if self.wrap:
+                nx %= w
+                ny %= h
+            elif not (0 <= nx < w and 0 <= ny < h):
+                continue
+            if occ[ny * w + nx] and (nx, ny) != tail:
+                continue
+            dist = abs(fx - nx) + abs(fy - ny)
+            if best_d is None or dist < best_d:
+                best, best_d = d, dist
+        return best
+
+
+class AutopilotPolicy(Autopilot):
+    def __init__(self, grid_w, grid_h, difficulty, rng):
+        super().__init__(grid_w, grid_h, difficulty, latency_window=1)
+
+
+POLICIES = {"random": RandomPolicy, "greedy": GreedyPolicy, "autopilot": AutopilotPolicy}
+
+# 工作进程内缓存：同一变体的引擎与策略只构造一次，跨任务复用
+_worker_cache = {}
+
+
+def run_chunk(task):
+    variant, grid_w, grid_h, seed, first, count, max_ticks = task
+    policy_name, difficulty, base_speed = variant
+    key = (variant, grid_w, grid_h)
+    if key not in _worker_cache:
+        rng = random.Random()
+        _worker_cache[key] = (SnakeEngine(grid_w, grid_h, difficulty),
+                              POLICIES[policy_name](grid_w, grid_h, difficulty, rng), rng)
+    engine, policy, rng = _worker_cache[key]
+
+    scores, lengths, ticks, deaths = array("i"), array("i"), array("i"), array("b")
+    seconds = array("d")
+    for g in range(first, first + count):
+        game_seed = seed + g
+        state = engine.reset(game_seed)
+        rng.seed(game_seed ^ 0x5EED)
+        policy.reset()
+        step, decide = engine.step, policy.decide
+        # 按游戏中的速度曲线 min(60, base_speed + score // 3) 折算真实时长
+        elapsed = 0.0
+        done = False
+        while not done and state.ticks < max_ticks:
+            elapsed += 1.0 / min(60, base_speed + state.score // 3)
+            state, _, done = step(decide(state))
+        scores.append(state.score)
+        lengths.append(len(state.snake))
+        ticks.append(state.ticks)
+        deaths.append(DEATH_CODES["win" if state.won else state.death])
+        seconds.append(elapsed)
+    return variant, count, scores.tobytes(), lengths.tobytes(), ticks.tobytes(), deaths.tobytes(), seconds.tobytes()
+
+
+class Summary:
+    def __init__(self):
+        self.scores = array("i")
+        self.lengths = array("i")
+        self.ticks = array("i")
+        self.deaths = array("b")
+        self.seconds = array("d")
+
+    def add(self, scores, lengths, ticks, deaths, seconds):
+        self.scores.frombytes(scores)
+        self.lengths.frombytes(lengths)
+        self.ticks.frombytes(ticks)
+        self.deaths.frombytes(deaths)
+        self.seconds.frombytes(seconds)
+
+    def stats(self):
+        n = len(self.scores)
+        s = sorted(self.scores)
+        mean = sum(s) / n
+        var = sum((v - mean) ** 2 for v in s) / n
+        q = lambda p: s[min(n - 1, int(p * (n - 1) + 0.5))]
+        causes = {name: 0 for name in DEATH_NAMES}
+        for code in self.deaths:
+            causes[DEATH_NAMES[code]] += 1
+        return {
+            "games": n,
+            "score_mean": mean,
+            "score_std": math.sqrt(var),
+            "score_min": s[0],
+            "score_p10": q(0.10),
+            "score_median": q(0.50),
+            "score_p90": q(0.90),
+            "score_max": s[-1],
+            "length_mean": sum(self.lengths) / n,
+            "ticks_mean": sum(self.ticks) / n,
+            "seconds_mean": sum(self.seconds) / n,
+            "causes": causes,
+        }
+
+
+def make_tasks(variants, games, grid_w, grid_h, seed, max_ticks, chunk):
+    # 各变体使用相同的对局序号与种子，便于成对比较
+    for first in range(0, games, chunk):
+        count = min(chunk, games - first)
+        for variant in variants:
+            yield variant, grid_w, grid_h, seed, first, count, max_ticks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多进程批量运行无界面对局并汇总统计")
+    parser.add_argument("--games", type=int, default=1000, help="每个变体的对局数")
+    parser.add_argument("--policy", default="greedy", help=f"逗号分隔，可选 {','.join(POLICIES)}")
+    parser.add_argument("--difficulty", default="wrap", help="逗号分隔：wrap,wall")
+    parser.add_argument("--base-speed", default="10", help="逗号分隔的基础速度，用于折算存活时长")
+    parser.add_argument("--grid", default=f"{GRID_W}x{GRID_H}", help="棋盘大小，如 30x20")
+    parser.add_argument("--max-ticks", type=int, default=100000, help="单局 tick 上限，超出记为 timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=CHUNK_GAMES, help="每个任务的对局数")
+    parser.add_argument("--json", metavar="FILE", help="汇总结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error(f"--games must be at least 1: {args.games}")
+    if args.chunk < 1:
+        parser.error(f"--chunk must be at least 1: {args.chunk}")
+
+    w, h = (int(v) for v in args.grid.lower().split("x"))
+    policies = args.policy.split(",")
+    for p in policies:
+        if p not in POLICIES:
+            parser.error(f"unknown policy: {p}")
+    difficulties = args.difficulty.split(",")
+    for d in difficulties:
+        if d not in ("wrap", "wall"):
+            parser.error(f"unknown difficulty: {d}")
+    speeds = [int(v) for v in args.base_speed.split(",")]
+    for v in speeds:
+        if v < 1:
+            parser.error(f"base speed must be at least 1: {v}")
+    variants = list(itertools.product(policies, difficulties, speeds))
+
+    summaries = {v: Summary() for v in variants}
+    tasks = make_tasks(variants, args.games, w, h, args.seed, args.max_ticks, args.chunk)
+    total = args.games * len(variants)
+    done_games = 0
+    t0 = time.perf_counter()
+    if args.workers > 1:
+        pool = multiprocessing.Pool(args.workers)
+        results = pool.imap_unordered(run_chunk, tasks)
+    else:
+        pool = None
+        results = map(run_chunk, tasks)
+    try:
+        for variant, count, *arrays in results:
+            summaries[variant].add(*arrays)
+            done_games += count
+            print(f"\r{done_games}/{total} games", end="", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - t0
+    print(file=sys.stderr)
+
+    report = {"grid": [w, h], "games_per_variant": args.games, "seed": args.seed, "workers": args.workers,
+              "elapsed_sec": elapsed, "games_per_sec": total / elapsed, "variants": []}
+    print(f"{'policy':<10} {'diff':<5} {'speed':>5} {'games':>7} {'score':>8} {'±':>6} {'p50':>5} {'max':>5} "
+          f"{'ticks':>8} {'secs':>7}  causes")
+    for variant in variants:
+        st = summaries[variant].stats()
+        policy, difficulty, speed = variant
+        report["variants"].append({"policy": policy, "difficulty": difficulty, "base_speed": speed, **st})
+        causes = " ".join(f"{k}={v}" for k, v in st["causes"].items() if v)
+        print(f"{policy:<10} {difficulty:<5} {speed:>5} {st['games']:>7} {st['score_mean']:>8.2f} "
+              f"{st['score_std']:>6.2f} {st['score_median']:>5} {st['score_max']:>5} {st['ticks_mean']:>8.1f} "
+              f"{st['seconds_mean']:>7.1f}  {causes}")
+    print(f"{total} games in {elapsed:.2f}s ({total / elapsed:.0f} games/s, {args.workers} workers)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+
+from collections import deque
+
+from snake_engine import SnakeEngine, GameState, FreeCells, DIRECTIONS, random_food
+from snake_autopilot import hamiltonian_cycle
+from snake_state import CompactState
+
+# 性能基准：模拟 tick 吞吐、食物放置延迟、各绘制阶段耗时、批量环境吞吐、状态快照开销、训练观测开销，结果输出为 JSON 便于版本间对比
+# 用法：python snake_bench.py [--quick] [--only ticks,food,render,vec,state,obs] [--out result.json] [--label v1]
+
+TICK_SIZES = [(30, 20), (100, 100), (500, 500)]
+TICK_LENGTHS = [3, 100, 1000, 10000]
+FOOD_FILLS = [0.10, 0.25, 0.50, 0.75, 0.90, 0.95, 0.99]
+RENDER_LENGTHS = [3, 100, 500]
+VEC_COUNTS = [1000, 10000]
+STATE_SIZES = [(30, 20), (100, 100), (250, 250)]
+STATE_LENGTHS = [3, 1000]
+OBS_LENGTHS = [3, 100, 500]
+OBS_COUNTS = [1000, 10000]
+
+
+def timeit(fn, min_time=0.2, repeat=3):
+    # 自动选择循环次数，取多轮中最快的每次耗时（秒）
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        fn(n)
+        dt = time.perf_counter() - t0
+        if dt >= min_time / 10 or n >= 1 << 30:
+            break
+        n *= 10
+    n = max(1, int(n * (min_time / max(dt, 1e-9))))
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(n)
+        dt = (time.perf_counter() - t0) / n
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def make_cycle_state(engine, length):
+    # 沿哈密顿回路摆放指定长度的蛇；不放食物，长度保持不变，只测移动与碰撞
+    w, h = engine.grid_w, engine.grid_h
+    cycle = hamiltonian_cycle(w, h)
+    body = cycle[:length][::-1]
+    occ = bytearray(w * h)
+    free = FreeCells(w, h)
+    for x, y in body:
+        occ[y * w + x] = 1
+        free.take(y * w + x)
+    (hx, hy), (bx, by) = body[0], body[1]
+    state = GameState(deque(body), occ, free, DIRECTIONS.index((hx - bx, hy - by)), None)
+    engine.state = state
+    return state, cycle
+
+
+def bench_ticks(sizes, lengths):
+    codes = {d: i for i, d in enumerate(DIRECTIONS)}
+    results = []
+    for w, h in sizes:
+        for length in lengths:
+            if length >= w * h:
+                continue
+            engine = SnakeEngine(w, h, "wall")
+            _, cycle = make_cycle_state(engine, length)
+            # 预先算好沿回路每一步的方向，测量时只调用 step()
+            actions = []
+            for i in range(len(cycle)):
+                (x0, y0), (x1, y1) = cycle[i], cycle[(i + 1) % len(cycle)]
+                actions.append(codes[(x1 - x0, y1 - y0)])
+            period = len(actions)
+            pos = [length - 1]
+
+            def run(n, step=engine.step, actions=actions, period=period, pos=pos):
+                i = pos[0]
+                for _ in range(n):
+                    step(actions[i])
+                    i += 1
+                    if i == period:
+                        i = 0
+                pos[0] = i
+
+            per_tick = timeit(run)
+            assert engine.state.alive, "benchmark snake died"
+            results.append({"grid": [w, h], "length": length, "ticks_per_sec": 1.0 / per_tick,
+                            "ns_per_tick": per_tick * 1e9})
+    return results
+
+
+def bench_food(fills, size=(100, 100)):
+    w, h = size
+    rng = random.Random(0)
+    results = []
+    for fill in fills:
+        free = FreeCells(w, h)
+        cells = list(range(w * h))
+        rng.shuffle(cells)
+        for idx in cells[:int(w * h * fill)]:
+            free.take(idx)
+
+        def run(n, free=free, rng=rng):
+            for _ in range(n):
+                random_food(free, rng)
+
+        per_call = timeit(run)
+        results.append({"grid": [w, h], "fill": fill, "ns_per_call": per_call * 1e9})
+    return results
+
+
+def bench_render(lengths):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import pygame
+        import snake
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((snake.WIDTH, snake.HEIGHT))
+    font = pygame.font.Font(None, snake.FONT_SZ)
+    win_w, win_h = screen.get_size()
+    snake.fit_board(win_w, win_h)
+    grid_layer = snake.build_grid_layer((win_w, win_h))
+    color, head_color = snake.GREEN, (0, 160, 0)
+    label = snake.render_text(font, "分数:", "zh")
+
+    result = {
+        "driver": os.environ["SDL_VIDEODRIVER"],
+        "window": [win_w, win_h],
+        "grid": [snake.GRID_W, snake.GRID_H],
+        "phases": {},
+        "frames": [],
+    }
+
+    def phase(name, fn):
+        result["phases"][name] = timeit(fn) * 1e6  # 微秒
+
+    phase("draw_grid", lambda n: [snake.draw_grid(screen) for _ in range(n)])
+    phase("grid_layer_blit", lambda n: [screen.blit(grid_layer, (0, 0)) for _ in range(n)])
+    phase("draw_cell", lambda n: [snake.draw_cell(screen, (1, 1), color) for _ in range(n)])
+    phase("hud_render_uncached", lambda n: [font.render(f"{label} {i}", True, snake.WHITE) for i in range(n)])
+    phase("hud_render_cached", lambda n: [snake.render_cached(font, f"{label} 12", True, snake.WHITE) for _ in range(n)])
+    phase("display_flip", lambda n: [pygame.display.flip() for _ in range(n)])
+
+    for length in lengths:
+        engine = SnakeEngine(snake.GRID_W, snake.GRID_H, "wall")
+        if length >= snake.GRID_W * snake.GRID_H:
+            continue
+        state, _ = make_cycle_state(engine, length)
+        state.food = random_food(state.free, random.Random(0))
+        hud = [(snake.render_cached(font, f"{label} 0", True, snake.WHITE), pygame.Rect(8, 8, 80, 20))]
+
+        def full(n):
+            for _ in range(n):
+                screen.fill(snake.BLACK)
+                snake.draw_grid(screen)
+                snake.draw_board(screen, state, color, head_color)
+                screen.blit(*hud[0])
+                pygame.display.flip()
+
+        def dirty(n):
+            cells = [state.snake[0], state.snake[1], state.snake[-1], state.food]
+            for _ in range(n):
+                rects = [snake.cell_rect(c) for c in cells]
+                for r in rects:
+                    snake.redraw_region(screen, grid_layer, r, state, color, head_color, hud)
+                pygame.display.update(rects)
+
+        result["frames"].append({"length": length, "full_frame_us": timeit(full) * 1e6,
+                                 "dirty_frame_us": timeit(dirty) * 1e6})
+    pygame.quit()
+    return result
+
+
+def bench_vec(counts, size=(30, 20), ticks=200):
+    try:
+        import numpy as np
+        from snake_vec import VecSnake
+    except ImportError as e:
+        return {"skipped": str(e)}
+    results = []
+    for n in counts:
+        env = VecSnake(n, size[0], size[1], "wrap", seed=0)
+        actions = np.random.default_rng(0).integers(-1, 4, size=(ticks, n), dtype=np.int32)
+        t0 = time.perf_counter()
+        for t in range(ticks):
+            env.step(actions[t])
+        elapsed = time.perf_counter() - t0
+        results.append({"grid": list(size), "boards": n, "board_ticks_per_sec": n * ticks / elapsed})
+    return results
+
+
+def bench_state(sizes, lengths):
+    # 前瞻/回滚场景：每次 "快照 -> 走一步 -> 还原" 的开销，以及序列化开销
+    results = []
+    for w, h in sizes:
+        for length in lengths:
+            if length >= w * h:
+                continue
+            engine = SnakeEngine(w, h, "wall")
+            state, cycle = make_cycle_state(engine, length)
+            (x0, y0), (x1, y1) = cycle[length - 1], cycle[length % len(cycle)]
+            action = DIRECTIONS.index((x1 - x0, y1 - y0))
+            compact = CompactState.from_game_state(state, w, h, "wall")
+
+            def engine_rollback(n, engine=engine, action=action):
+                for _ in range(n):
+                    snap = engine.snapshot()
+                    engine.step(action)
+                    engine.restore(snap)
+
+            def compact_rollback(n, st=compact, action=action):
+                for _ in range(n):
+                    token = st.snapshot()
+                    st.step(action)
+                    st.restore(token)
+
+            results.append({
+                "grid": [w, h], "length": length,
+                "engine_rollback_us": timeit(engine_rollback) * 1e6,
+                "compact_rollback_us": timeit(compact_rollback) * 1e6,
+                "compact_to_bytes_us": timeit(lambda n, st=compact: [st.to_bytes() for _ in range(n)]) * 1e6,
+                "compact_bytes": len(compact.to_bytes()),
+            })
+    return results
+
+
+def bench_obs(lengths, counts, size=(30, 20), ticks=100):
+    try:
+        import numpy as np
+        from snake_vec import VecSnake
+        from snake_obs import Observer, VecObserver
+    except ImportError as e:
+        return {"skipped": str(e)}
+    codes = {d: i for i, d in enumerate(DIRECTIONS)}
+    w, h = size
+    # 单局：沿回路走一步并增量更新观测，对比按蛇身整体重建
+    single = []
+    for length in lengths:
+        engine = SnakeEngine(w, h, "wall")
+        state, cycle = make_cycle_state(engine, length)
+        actions = [codes[(x1 - x0, y1 - y0)] for (x0, y0), (x1, y1) in zip(cycle, cycle[1:] + cycle[:1])]
+        obs = Observer(w, h, "wall")
+        obs.update(state)
+        pos = [length - 1]
+
+        def run(n, step=engine.step, update=obs.update, actions=actions, pos=pos):
+            i = pos[0]
+            for _ in range(n):
+                update(step(actions[i])[0])
+                i = (i + 1) % len(actions)
+            pos[0] = i
+
+        single.append({"grid": [w, h], "length": length, "step_update_us": timeit(run) * 1e6,
+                       "rebuild_us": timeit(lambda n, obs=obs: [obs._rebuild(engine.state) for _ in range(n)]) * 1e6})
+    # 批量：VecSnake 每 tick 的 step 与观测更新（不含 / 含射线特征）
+    batch = []
+    for n in counts:
+        actions = np.random.default_rng(0).integers(-1, 4, size=(ticks, n), dtype=np.int32)
+        row = {"grid": [w, h], "boards": n}
+        for name, rays in (("step_ms", None), ("step_planes_ms", False), ("step_planes_rays_ms", True)):
+            env = VecSnake(n, w, h, "wrap", seed=0)
+            obs = None if rays is None else VecObserver(env, rays=rays)
+            t0 = time.perf_counter()
+            for t in range(ticks):
+                _, done = env.step(actions[t])
+                if obs is not None:
+                    obs.update(done)
+            row[name] = (time.perf_counter() - t0) / ticks * 1e3
+        batch.append(row)
+    return {"single": single, "batch": batch}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="贪吃蛇性能基准")
+    parser.add_argument("--quick", action="store_true", help="缩小规模，快速跑一遍")
+    parser.add_argument("--only", default="ticks,food,render,vec,state,obs", help="逗号分隔：ticks,food,render,vec,state,obs")
+    parser.add_argument("--out", help="结果写入文件（默认输出到标准输出）")
+    parser.add_argument("--label", help="给本次结果加的标签，如版本号")
+    args = parser.parse_args(argv)
+    parts = set(args.only.split(","))
+
+    sizes, lengths = (TICK_SIZES[:2], TICK_LENGTHS[:3]) if args.quick else (TICK_SIZES, TICK_LENGTHS)
+    report = {
+        "label": args.label,
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+    if "ticks" in parts:
+        report["ticks"] = bench_ticks(sizes, lengths)
+    if "food" in parts:
+        report["food"] = bench_food(FOOD_FILLS)
+    if "render" in parts:
+        report["render"] = bench_render(RENDER_LENGTHS[:2] if args.quick else RENDER_LENGTHS)
+    if "vec" in parts:
+        report["vec"] = bench_vec(VEC_COUNTS[:1] if args.quick else VEC_COUNTS)
+    if "state" in parts:
+        report["state"] = bench_state(STATE_SIZES[:2] if args.quick else STATE_SIZES, STATE_LENGTHS)
+    if "obs" in parts:
+        report["obs"] = bench_obs(OBS_LENGTHS, OBS_COUNTS[:1] if args.quick else OBS_COUNTS)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
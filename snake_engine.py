@@ -0,0 +1,220 @@
+import random
+from array import array
+from collections import deque
+
+# 无 pygame 依赖的游戏规则核心：移动、包裹/撞墙、自撞、食物与计分
+# snake.py 的 game_loop() 只负责输入与绘制，规则都在这里
+
+GRID_W, GRID_H = 30, 20
+
+# 方向编码（供机器人/回放使用）：0 上，1 右，2 下，3 左
+UP, RIGHT, DOWN, LEFT = 0, 1, 2, 3
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+# 奖励
+REWARD_FOOD = 1
+REWARD_DEATH = -1
+
+
+# 0..n-1 的模板数组（按元素类型各一份）；切片复制是整块内存拷贝，大棋盘每局重开不必再逐个生成下标
+_identity = {}
+
+
+def index_typecode(n):
+    # 能容纳 0..n-1 的最小无符号类型：不超过 65536 格时每个下标 2 字节，否则 4 字节
+    return "H" if n <= 1 << 16 else "I"
+
+
+def _iota(n):
+    tc = index_typecode(n)
+    template = _identity.get(tc)
+    if template is None or len(template) < n:
+        template = _identity[tc] = array(tc, range(n))
+    return template[:n]
+
+
+class FreeCells:
+    """空闲格子索引：cells 前 count 个是空闲格（下标 y*grid_w+x），slot 为格子在 cells 中的位置。
+
+    占用/释放都是与分界处交换，因此 take / release / 随机抽取都是 O(1)，与蛇长无关。
+    代价是两个下标数组：加上占用网格，每格共 5 字节（不超过 65536 格）或 9 字节（更大的棋盘，
+    2000x2000 约 36 MB）。快照会复制这两个数组：cells 的顺序决定食物落点，按占用网格重建会
+    打乱顺序，回放就无法复现。
+    """
+
+    __slots__ = ("grid_w", "cells", "slot", "count")
+
+    def __init__(self, grid_w, grid_h):
+        n = grid_w * grid_h
+        self.grid_w = grid_w
+        self.cells = _iota(n)
+        self.slot = _iota(n)
+        self.count = n
+
+    def _swap(self, idx, pos):
+        cells, slot = self.cells, self.slot
+        s = slot[idx]
+        other = cells[pos]
+        cells[s] = other
+        slot[other] = s
+        cells[pos] = idx
+        slot[idx] = pos
+
+    def take(self, idx):
+        # 换到空闲区末尾后收缩分界
+        self.count -= 1
+        self._swap(idx, self.count)
+
+    def release(self, idx):
+        # 换到分界处后扩张
+        self._swap(idx, self.count)
+        self.count += 1
+
+    def move(self, take_idx, release_idx):
+        # 同一 tick 占用新头、释放旧尾：两者直接对调位置，分界不变
+        cells, slot = self.cells, self.slot
+        a = slot[take_idx]
+        b = slot[release_idx]
+        cells[a] = release_idx
+        slot[release_idx] = a
+        cells[b] = take_idx
+        slot[take_idx] = b
+
+    def is_free(self, idx):
+        return self.slot[idx] < self.count
+
+    def copy(self):
+        other = FreeCells.__new__(FreeCells)
+        other.grid_w = self.grid_w
+        other.cells = self.cells[:]
+        other.slot = self.slot[:]
+        other.count = self.count
+        return other
+
+
+def random_food(free, rng=random):
+    # 从空闲格索引中等概率抽取，任意填充率下都是 O(1)；棋盘已满时返回 None
+    if not free.count:
+        return None
+    idx = free.cells[rng.randrange(free.count)]
+    return (idx % free.grid_w, idx // free.grid_w)
+
+
+class GameState:
+    """一局游戏的可变状态。step() 原地更新并返回同一个对象。"""
+
+    __slots__ = ("snake", "occ", "free", "direction", "food", "score", "alive", "won", "ticks", "death")
+
+    def __init__(self, snake, occ, free, direction, food):
+        self.snake = snake          # 蛇身坐标 deque，head first（头尾进出均为 O(1)）
+        self.occ = occ              # 占用网格 bytearray(GRID_W*GRID_H)，下标 y*GRID_W+x
+        self.free = free            # 空闲格索引 FreeCells，用于放置食物
+        self.direction = direction  # 当前方向编码
+        self.food = food
+        self.score = 0
+        self.alive = True
+        self.won = False            # 蛇占满棋盘
+        self.ticks = 0
+        self.death = None           # 死因："wall" / "self"
+
+    @property
+    def head(self):
+        return self.snake[0]
+
+    def copy(self):
+        other = GameState(deque(self.snake), bytearray(self.occ), self.free.copy(), self.direction, self.food)
+        other.score = self.score
+        other.alive = self.alive
+        other.won = self.won
+        other.ticks = self.ticks
+        other.death = self.death
+        return other
+
+
+class SnakeEngine:
+    """无界面的贪吃蛇引擎：reset(seed) 开局，step(action) 推进一个 tick。"""
+
+    def __init__(self, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap"):
+        if difficulty not in ("wrap", "wall"):
+            raise ValueError(f"unknown difficulty: {difficulty!r}")
+        if grid_w < 1 or grid_h < 5:
+            raise ValueError(f"grid too small: {grid_w}x{grid_h}")
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.difficulty = difficulty
+        self.rng = random.Random()
+        self.state = None
+
+    def reset(self, seed=None):
+        self.rng.seed(seed)
+        # 初始蛇（head first，身体在 head 的下方，配合初始方向向上）
+        w, h = self.grid_w, self.grid_h
+        snake = deque((w // 2, h // 2 + i) for i in range(3))
+        occ = bytearray(w * h)
+        free = FreeCells(w, h)
+        for x, y in snake:
+            occ[y * w + x] = 1
+            free.take(y * w + x)
+        self.state = GameState(snake, occ, free, UP, random_food(free, self.rng))
+        return self.state
+
+    # 快照包含状态副本与 RNG 状态，restore 后继续 step 的结果与原局完全一致
+    def snapshot(self):
+        return self.state.copy(), self.rng.getstate()
+
+    def restore(self, snap):
+        state, rng_state = snap
+        self.state = state.copy()
+        self.rng.setstate(rng_state)
+        return self.state
+
+    def step(self, action=None):
+        # action 为方向编码；None 表示保持当前方向，反向输入被忽略
+        st = self.state
+        if not st.alive:
+            return st, 0, True
+        if action is not None and action != (st.direction + 2) % 4:
+            st.direction = action
+        st.ticks += 1
+
+        hx, hy = st.snake[0]
+        dx, dy = DIRECTIONS[st.direction]
+        new_x, new_y = hx + dx, hy + dy
+        if self.difficulty == "wrap":
+            new_head = (new_x % self.grid_w, new_y % self.grid_h)
+        elif 0 <= new_x < self.grid_w and 0 <= new_y < self.grid_h:
+            new_head = (new_x, new_y)
+        else:
+            # 碰到边界即死亡
+            st.alive = False
+            st.death = "wall"
+            return st, REWARD_DEATH, True
+
+        # 撞到自己判断：尾巴在同一 tick 会移走，所以（不吃食物时）可以走进尾巴原来的格子
+        snake, occ, w = st.snake, st.occ, self.grid_w
+        idx = new_head[1] * w + new_head[0]
+        eating = new_head == st.food
+        if occ[idx] and (eating or new_head != snake[-1]):
+            st.alive = False
+            st.death = "self"
+            return st, REWARD_DEATH, True
+
+        snake.appendleft(new_head)
+        if not eating:
+            tx, ty = snake.pop()
+            tail = ty * w + tx
+            occ[tail] = 0
+            occ[idx] = 1
+            st.free.move(idx, tail)
+            return st, 0, False
+
+        occ[idx] = 1
+        st.free.take(idx)
+        st.score += 1
+        st.food = random_food(st.free, self.rng)
+        if st.food is None:
+            # 棋盘已满：胜利结束
+            st.alive = False
+            st.won = True
+            return st, REWARD_FOOD, True
+        return st, REWARD_FOOD, False
@@ -0,0 +1,548 @@
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+from collections import deque, Counter
+
+from snake_engine import GRID_W, GRID_H, UP, DIRECTIONS, FreeCells, random_food
+
+# 多人联机：asyncio 服务器，一个进程承载多个房间，每个房间按自己的 tick 速率权威推进。
+# 规则与 SnakeEngine 一致（包裹/撞墙、尾巴同 tick 释放、吃到食物 +1），扩展到多条蛇：
+# 撞到任何蛇身或两个蛇头撞进同一格都会死亡，死后清出棋盘，RESPAWN_TICKS 后在空处重生。
+#
+# 协议：TCP 上每行一个 JSON 对象
+#   客户端 -> 服务器  {"t": "join", "room": "lobby"}（可选 grid / difficulty / rate，仅创建房间时生效）
+#                     {"t": "dir", "d": 0..3}
+#   服务器 -> 客户端  {"t": "snap", ...}  完整快照：加入时、以及发送缓冲积压后追上时各发一次；
+#                     players 为房间内全部玩家的 [[pid, 分数], ...]，包括等待重生和尚未出生的
+#                     {"t": "tick", "n": tick, "moves": [[pid, 头x, 头y, 尾x, 尾y], ...], ...}
+#                     每 tick 的增量：moves 中尾坐标为 -1 表示这一步吃到食物没有释放尾巴；
+#                     join / dead / left / spawn / food / score 只在有变化时出现
+# 用法：python snake_net.py serve [--port 7777]
+#       python snake_net.py bots --rooms 200 --per-room 2   （压测用的随机机器人）
+#       python snake.py --connect 127.0.0.1:7777 --room lobby
+
+DEFAULT_PORT = 7777
+TICK_RATE = 10
+TURN_BUFFER = 3
+RESPAWN_TICKS = 20
+SPAWN_TRIES = 50
+JOIN_TIMEOUT = 10.0
+SEND_HIGH = 64 * 1024  # 单个客户端发送缓冲超过此值即视为落后，停发增量
+SEND_LOW = 8 * 1024    # 落后的客户端缓冲降到此值以下时补发一次完整快照
+STATS_INTERVAL = 10.0
+MAX_GRID = (1000, 1000)  # 客户端创建房间时可请求的最大棋盘（服务器 --max-grid 可改）
+MIN_RATE, MAX_RATE = 1.0, 60.0  # 客户端可请求的 tick 速率范围（每秒）
+
+
+def encode(msg):
+    return json.dumps(msg, separators=(",", ":")).encode() + b"\n"
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, default_port
+    return host, int(port)
+
+
+class Player:
+    __slots__ = ("pid", "writer", "snake", "direction", "turns", "score", "alive", "respawn_at", "behind")
+
+    def __init__(self, pid, writer, respawn_at):
+        self.pid = pid
+        self.writer = writer
+        self.snake = deque()
+        self.direction = UP
+        self.turns = deque()
+        self.score = 0
+        self.alive = False
+        self.respawn_at = respawn_at
+        self.behind = False
+
+
+class Room:
+    """一个房间：共享棋盘上的多条蛇，按 rate 每秒推进一次并向所有玩家广播增量。"""
+
+    def __init__(self, name, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap", rate=TICK_RATE, seed=None):
+        if difficulty not in ("wrap", "wall"):
+            raise ValueError(f"unknown difficulty: {difficulty!r}")
+        if grid_w < 1 or grid_h < 5:
+            raise ValueError(f"grid too small: {grid_w}x{grid_h}")
+        if not 0 < rate <= 60:
+            raise ValueError(f"tick rate out of range: {rate}")
+        self.name = name
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.wrap = difficulty == "wrap"
+        self.rate = rate
+        self.rng = random.Random(seed)
+        self.occ = bytearray(grid_w * grid_h)  # 只标记蛇身；食物格在 free 中已占用但 occ 为 0
+        self.free = FreeCells(grid_w, grid_h)
+        self.food = []
+        self.players = {}
+        self.joined = []
+        self.left = []
+        self.tick = 0
+        self.next_pid = 1
+
+    def add_player(self, writer):
+        player = Player(self.next_pid, writer, self.tick + 1)
+        self.next_pid += 1
+        self.players[player.pid] = player
+        self.joined.append(player.pid)
+        writer.write(encode(self.snapshot(player.pid)))
+        return player
+
+    def remove_player(self, player):
+        if self.players.pop(player.pid, None) is None:
+            return
+        if player.alive:
+            self._clear(player)
+        self.left.append(player.pid)
+
+    def turn(self, player, action):
+        # 与单机版相同：缓冲有限，忽略与最后一次转向相同或相反的输入
+        if not player.alive or not 0 <= action < 4 or len(player.turns) >= TURN_BUFFER:
+            return
+        last = player.turns[-1] if player.turns else player.direction
+        if action != last and action != (last + 2) % 4:
+            player.turns.append(action)
+
+    def _clear(self, player):
+        w, occ, free = self.grid_w, self.occ, self.free
+        for x, y in player.snake:
+            idx = y * w + x
+            occ[idx] = 0
+            free.release(idx)
+        player.snake.clear()
+        player.alive = False
+
+    def _spawn(self, player):
+        # 随机找一处竖直三格连续空闲、且前方一格也空闲的位置，蛇头朝上
+        w, h, free = self.grid_w, self.grid_h, self.free
+        for _ in range(SPAWN_TRIES):
+            pos = random_food(free, self.rng)
+            if pos is None:
+                return False
+            x, y = pos
+            if not self.wrap and (y < 1 or y + 2 >= h):
+                continue
+            cells = [(x, (y + i) % h) for i in range(-1, 3)]
+            if all(free.is_free(cy * w + cx) for cx, cy in cells):
+                body = cells[1:]
+                for cx, cy in body:
+                    self.occ[cy * w + cx] = 1
+                    free.take(cy * w + cx)
+                player.snake = deque(body)
+                player.direction = UP
+                player.turns.clear()
+                player.score = 0
+                player.alive = True
+                return True
+        return False
+
+    def step(self):
+        # 推进一个 tick，返回本 tick 的增量消息
+        self.tick += 1
+        w, h, occ, free = self.grid_w, self.grid_h, self.occ, self.free
+        foods = set(self.food)
+        delta = {"t": "tick", "n": self.tick}
+        if self.joined:
+            delta["join"] = self.joined
+            self.joined = []
+        if self.left:
+            delta["left"] = self.left
+            self.left = []
+
+        moves, dead = [], []
+        for p in self.players.values():
+            if not p.alive:
+                continue
+            if p.turns:
+                p.direction = p.turns.popleft()
+            dx, dy = DIRECTIONS[p.direction]
+            hx, hy = p.snake[0]
+            nx, ny = hx + dx, hy + dy
+            if self.wrap:
+                nx %= w
+                ny %= h
+            elif not (0 <= nx < w and 0 <= ny < h):
+                dead.append(p)
+                continue
+            moves.append((p, ny * w + nx, (nx, ny), (nx, ny) in foods))
+
+        # 不吃食物的蛇在同一 tick 释放尾巴，可以走进去；两个蛇头进同一格则都死亡
+        freed = set()
+        for p, idx, pos, eating in moves:
+            if not eating:
+                tx, ty = p.snake[-1]
+                freed.add(ty * w + tx)
+        targets = Counter(m[1] for m in moves)
+        survivors = []
+        for m in moves:
+            idx = m[1]
+            if targets[idx] > 1 or (occ[idx] and idx not in freed):
+                dead.append(m[0])
+            else:
+                survivors.append(m)
+
+        for p in dead:
+            self._clear(p)
+            p.respawn_at = self.tick + RESPAWN_TICKS
+        if dead:
+            delta["dead"] = [p.pid for p in dead]
+
+        # 先释放所有尾巴再占用新头，蛇头可以跟进别的蛇刚离开的尾格
+        out, tails = [], []
+        for p, idx, pos, eating in survivors:
+            if eating:
+                tails.append((-1, -1))
+            else:
+                tx, ty = p.snake.pop()
+                occ[ty * w + tx] = 0
+                free.release(ty * w + tx)
+                tails.append((tx, ty))
+        scores = []
+        for (p, idx, pos, eating), (tx, ty) in zip(survivors, tails):
+            p.snake.appendleft(pos)
+            occ[idx] = 1
+            if eating:
+                self.food.remove(pos)  # 食物格在 free 中本就已占用
+                p.score += 1
+                scores.append([p.pid, p.score])
+            else:
+                free.take(idx)
+            out.append([p.pid, pos[0], pos[1], tx, ty])
+        delta["moves"] = out
+        if scores:
+            delta["score"] = scores
+
+        spawn = []
+        for p in self.players.values():
+            if not p.alive and self.tick >= p.respawn_at and self._spawn(p):
+                spawn.append([p.pid, [list(c) for c in p.snake], p.direction])
+        if spawn:
+            delta["spawn"] = spawn
+
+        # 每位玩家一个食物；食物格从 free 中取出，避免重复放置或重生在食物上
+        food_changed = bool(scores)
+        while len(self.food) < max(1, len(self.players)):
+            pos = random_food(free, self.rng)
+            if pos is None:
+                break
+            free.take(pos[1] * w + pos[0])
+            self.food.append(pos)
+            food_changed = True
+        if food_changed:
+            delta["food"] = [list(f) for f in self.food]
+        return delta
+
+    def snapshot(self, you):
+        return {
+            "t": "snap", "n": self.tick, "room": self.name, "you": you,
+            "grid": [self.grid_w, self.grid_h], "wrap": self.wrap, "rate": self.rate,
+            "food": [list(f) for f in self.food],
+            "snakes": [[p.pid, [list(c) for c in p.snake], p.direction, p.score]
+                       for p in self.players.values() if p.alive],
+            "players": [[p.pid, p.score] for p in self.players.values()],
+        }
+
+    def broadcast(self, delta):
+        # 增量只编码一次，所有客户端共享同一份 bytes；发送缓冲超限的客户端跳过，缓冲排空后补发快照
+        data = None
+        for p in self.players.values():
+            transport = p.writer.transport
+            if transport.is_closing():
+                continue
+            buffered = transport.get_write_buffer_size()
+            if p.behind:
+                if buffered <= SEND_LOW:
+                    p.behind = False
+                    p.writer.write(encode(self.snapshot(p.pid)))
+                continue
+            if buffered > SEND_HIGH:
+                p.behind = True
+                continue
+            if data is None:
+                data = encode(delta)
+            p.writer.write(data)
+
+
+class Server:
+    def __init__(self, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap", rate=TICK_RATE, max_grid=MAX_GRID):
+        self.defaults = {"grid_w": grid_w, "grid_h": grid_h, "difficulty": difficulty, "rate": rate}
+        self.max_grid = max_grid
+        self.rooms = {}
+        # 统计：tick 数、step + 广播耗时、tick 相对计划时间的最大延迟
+        self.ticks = 0
+        self.busy = 0.0
+        self.max_late = 0.0
+
+    def get_room(self, name, msg):
+        room = self.rooms.get(name)
+        if room is None:
+            # 客户端参数决定内存与 tick 频率，超出服务器允许的范围直接拒绝（NaN 不满足任何比较）
+            opts = dict(self.defaults)
+            if "grid" in msg:
+                w, h = (int(v) for v in msg["grid"])
+                if not (1 <= w <= self.max_grid[0] and 5 <= h <= self.max_grid[1]):
+                    raise ValueError(f"grid out of range: {w}x{h}")
+                opts["grid_w"], opts["grid_h"] = w, h
+            if "difficulty" in msg:
+                opts["difficulty"] = msg["difficulty"]
+            if "rate" in msg:
+                rate = float(msg["rate"])
+                if not MIN_RATE <= rate <= MAX_RATE:
+                    raise ValueError(f"tick rate out of range: {rate}")
+                opts["rate"] = rate
+            room = Room(name, **opts)
+            self.rooms[name] = room
+            asyncio.get_running_loop().create_task(self.run_room(room))
+        return room
+
+    async def run_room(self, room):
+        # 按计划时间推进，不累积误差；落后超过一个周期时直接重新对齐，不补跑
+        loop = asyncio.get_running_loop()
+        period = 1.0 / room.rate
+        deadline = loop.time()
+        try:
+            while room.players:
+                deadline += period
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    deadline = loop.time()
+                late = loop.time() - deadline
+                if late > self.max_late:
+                    self.max_late = late
+                t0 = time.perf_counter()
+                room.broadcast(room.step())
+                self.busy += time.perf_counter() - t0
+                self.ticks += 1
+        finally:
+            if self.rooms.get(room.name) is room:
+                del self.rooms[room.name]
+
+    async def handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        room = player = None
+        try:
+            msg = json.loads(await asyncio.wait_for(reader.readline(), JOIN_TIMEOUT))
+            if msg.get("t") != "join":
+                return
+            room = self.get_room(str(msg.get("room", "lobby")), msg)
+            player = room.add_player(writer)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                if msg.get("t") == "dir":
+                    room.turn(player, int(msg["d"]))
+        except (asyncio.TimeoutError, ValueError, OverflowError, KeyError, TypeError, AttributeError, ConnectionError):
+            pass  # 格式错误或断线：断开该客户端
+        finally:
+            if player is not None:
+                room.remove_player(player)
+            writer.close()
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            players = sum(len(r.players) for r in self.rooms.values())
+            per_tick = self.busy / self.ticks * 1e3 if self.ticks else 0.0
+            print(f"rooms {len(self.rooms)}, players {players}, {self.ticks / STATS_INTERVAL:.0f} ticks/s, "
+                  f"{per_tick:.3f} ms/tick, cpu {self.busy / STATS_INTERVAL:.0%}, max late {self.max_late * 1e3:.1f} ms",
+                  file=sys.stderr)
+            self.ticks, self.busy, self.max_late = 0, 0.0, 0.0
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"listening on {host}:{port}", file=sys.stderr)
+        asyncio.get_running_loop().create_task(self.report())
+        async with server:
+            await server.serve_forever()
+
+
+class ClientState:
+    """客户端对房间状态的镜像，由快照重建、由每 tick 的增量更新。"""
+
+    def __init__(self):
+        self.tick = -1
+        self.room = None
+        self.you = None
+        self.grid_w = self.grid_h = None
+        self.wrap = True
+        self.snakes = {}   # pid -> deque[(x, y)]，head first
+        self.scores = {}   # 房间内全部玩家（包括等待重生的）pid -> 分数
+        self.food = []
+
+    def apply(self, msg):
+        kind = msg.get("t")
+        if kind == "snap":
+            self.tick = msg["n"]
+            self.room = msg["room"]
+            self.you = msg["you"]
+            self.grid_w, self.grid_h = msg["grid"]
+            self.wrap = msg["wrap"]
+            self.food = [tuple(f) for f in msg["food"]]
+            self.snakes = {pid: deque(map(tuple, body)) for pid, body, _, _ in msg["snakes"]}
+            self.scores = {pid: score for pid, score in msg["players"]}
+        elif kind == "tick":
+            # 与 Room.step() 的顺序一致：加入/离开/死亡 -> 移动 -> 重生 -> 食物与分数
+            for pid in msg.get("join", ()):
+                self.scores.setdefault(pid, 0)
+            for pid in msg.get("left", ()):
+                self.snakes.pop(pid, None)
+                self.scores.pop(pid, None)
+            for pid in msg.get("dead", ()):
+                self.snakes.pop(pid, None)
+            for pid, hx, hy, tx, ty in msg["moves"]:
+                body = self.snakes[pid]
+                if tx >= 0:
+                    body.pop()
+                body.appendleft((hx, hy))
+            for pid, body, _ in msg.get("spawn", ()):
+                self.snakes[pid] = deque(map(tuple, body))
+                self.scores[pid] = 0
+            for pid, score in msg.get("score", ()):
+                self.scores[pid] = score
+            if "food" in msg:
+                self.food = [tuple(f) for f in msg["food"]]
+            self.tick = msg["n"]
+
+
+class NetClient:
+    """pygame 客户端用的非阻塞连接：poll() 读入并应用所有已到达的消息。"""
+
+    def __init__(self, host, port, room="lobby", timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.sendall(encode({"t": "join", "room": room}))
+        self.sock.setblocking(False)
+        self.buf = b""
+        self.out = b""  # 尚未写出的字节；非阻塞 send 可能只写出一部分，剩余的留到下次 flush
+        self.state = ClientState()
+        self.closed = False
+
+    def flush(self):
+        while self.out and not self.closed:
+            try:
+                n = self.sock.send(self.out)
+            except BlockingIOError:
+                break  # 发送缓冲满，留到下次 poll() 再写
+            except OSError:
+                self.closed = True
+                break
+            self.out = self.out[n:]
+
+    def poll(self):
+        # 返回本次是否收到了新消息
+        self.flush()
+        changed = False
+        while not self.closed:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b""
+            if not data:
+                self.closed = True
+                break
+            self.buf += data
+        if b"\n" in self.buf:
+            *lines, self.buf = self.buf.split(b"\n")
+            for line in lines:
+                self.state.apply(json.loads(line))
+            changed = True
+        return changed
+
+    def send_direction(self, action):
+        self.out += encode({"t": "dir", "d": action})
+        self.flush()
+
+    def close(self):
+        self.sock.close()
+        self.closed = True
+
+
+async def run_bot(host, port, room, seed, until, counts):
+    # 随机转向的机器人；同时维护 ClientState，模拟真实客户端的解析开销
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({"t": "join", "room": room}))
+    state = ClientState()
+    loop = asyncio.get_running_loop()
+    try:
+        while loop.time() < until:
+            line = await reader.readline()
+            if not line:
+                break
+            state.apply(json.loads(line))
+            counts[0] += 1
+            counts[1] += len(line)
+            if rng.random() < 0.3:
+                writer.write(encode({"t": "dir", "d": rng.randrange(4)}))
+    finally:
+        writer.close()
+
+
+async def run_bots(host, port, rooms, per_room, seconds):
+    loop = asyncio.get_running_loop()
+    until = loop.time() + seconds
+    counts = [0, 0]
+    bots = [run_bot(host, port, f"bots-{r}", r * per_room + i, until, counts)
+            for r in range(rooms) for i in range(per_room)]
+    await asyncio.gather(*bots, return_exceptions=True)
+    print(f"{rooms * per_room} bots in {rooms} rooms: {counts[0] / seconds:.0f} msgs/s, "
+          f"{counts[1] / seconds / 1024:.1f} KiB/s received")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="贪吃蛇多人联机服务器")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve", help="启动服务器")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--grid", default=f"{GRID_W}x{GRID_H}", help="新房间的默认棋盘大小，如 30x20")
+    serve.add_argument("--difficulty", choices=("wrap", "wall"), default="wrap")
+    serve.add_argument("--rate", type=float, default=TICK_RATE, help="新房间的默认 tick 速率（每秒）")
+    serve.add_argument("--max-grid", default=f"{MAX_GRID[0]}x{MAX_GRID[1]}", help="客户端可请求的最大棋盘，如 1000x1000")
+    bots = sub.add_parser("bots", help="连接随机机器人做压测")
+    bots.add_argument("--host", default="127.0.0.1")
+    bots.add_argument("--port", type=int, default=DEFAULT_PORT)
+    bots.add_argument("--rooms", type=int, default=100)
+    bots.add_argument("--per-room", type=int, default=2)
+    bots.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.cmd == "serve":
+            try:
+                w, h = (int(v) for v in args.grid.lower().split("x"))
+                max_grid = tuple(int(v) for v in args.max_grid.lower().split("x"))
+                max_w, max_h = max_grid
+            except ValueError:
+                parser.error(f"invalid --grid or --max-grid: {args.grid}, {args.max_grid}")
+            if not (1 <= w <= max_w and 5 <= h <= max_h):
+                parser.error(f"--grid {args.grid} outside 1x5..{args.max_grid}")
+            if not MIN_RATE <= args.rate <= MAX_RATE:
+                parser.error(f"--rate must be between {MIN_RATE:g} and {MAX_RATE:g}")
+            asyncio.run(Server(w, h, args.difficulty, args.rate, max_grid).serve(args.host, args.port))
+        else:
+            asyncio.run(run_bots(args.host, args.port, args.rooms, args.per_room, args.seconds))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import numpy as np
+
+from snake_engine import GRID_W, GRID_H, UP, RIGHT, DOWN, LEFT
+
+# 训练用观测：平面与特征都原地写进预先分配的 NumPy 数组，连续的 tick 之间只改动发生变化的格子
+#   planes    (C, H, W)  BODY 蛇身、HEAD 蛇头、FOOD 食物、DIR 方向
+#             DIR 平面中蛇头为当前方向，其余蛇身为通往下一节（靠近蛇头一侧）的方向，取值 (方向编码+1)/4，0 表示空，
+#             所以蛇身的先后顺序也能从平面中读出
+#   features  (F,)       当前方向 one-hot（4 个），以及从蛇头出发 8 条射线上到墙、蛇身、食物的距离倒数（8x3 个，没有则为 0）
+# 批量版本 VecObserver 对应 VecSnake：N 局的平面放在同一个 (N, C, H, W) 连续数组中，可直接交给训练框架（如 torch.from_numpy）
+# 渲染后的画面用 pixel_view(screen, snake.view_rect()) 取得与 Surface 共享内存的像素视图
+
+BODY, HEAD, FOOD, DIR = 0, 1, 2, 3
+PLANES = 4
+
+# 射线方向：从上开始顺时针，RAYS[2*d] 即方向 d
+RAYS = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+RAY_WALL, RAY_BODY, RAY_FOOD = 0, 1, 2
+RAY_FEATURES = 3
+FEATURES = 4 + RAY_FEATURES * len(RAYS)
+RAY_TABLE_SIZE = 1 << 22  # 射线格子表最多的元素数（int32，约 16 MB）
+
+
+def ray_limits(grid_w, grid_h, wrap):
+    # 每条射线最多走的步数：包裹模式下不能绕回蛇头，撞墙模式下足够走出边界
+    limits = []
+    for dx, dy in RAYS:
+        if wrap:
+            limits.append(grid_h - 1 if not dx else grid_w - 1 if not dy else max(grid_w, grid_h) - 1)
+        else:
+            limits.append(grid_h if not dx else grid_w if not dy else min(grid_w, grid_h))
+    return limits
+
+
+def ray_cells(grid_w, grid_h, wrap, heads):
+    # 从 heads 各格出发的 8 条射线依次经过的格子下标 (len(heads), 8, L)；走完或出界之后的位置填 grid_w*grid_h
+    limits = np.array(ray_limits(grid_w, grid_h, wrap))
+    k = np.arange(1, limits.max() + 1)
+    xs = heads[:, None, None] % grid_w + np.array([dx for dx, _ in RAYS])[:, None] * k
+    ys = heads[:, None, None] // grid_w + np.array([dy for _, dy in RAYS])[:, None] * k
+    if wrap:
+        xs %= grid_w
+        ys %= grid_h
+        valid = k <= limits[:, None]
+    else:
+        valid = (xs >= 0) & (xs < grid_w) & (ys >= 0) & (ys < grid_h)
+    return np.where(valid, ys * grid_w + xs, grid_w * grid_h).astype(np.int32)
+
+
+def towards(a, b, grid_w, grid_h, wrap):
+    # 相邻格 a -> b 的方向编码（格子下标，标量或数组）；包裹模式下跨边界的一步按 ±1 计
+    dx = b % grid_w - a % grid_w
+    dy = b // grid_w - a // grid_w
+    if wrap:
+        dx = np.where(dx > 1, dx - grid_w, np.where(dx < -1, dx + grid_w, dx))
+        dy = np.where(dy > 1, dy - grid_h, np.where(dy < -1, dy + grid_h, dy))
+    return np.where(dy < 0, UP, np.where(dy > 0, DOWN, np.where(dx > 0, RIGHT, LEFT)))
+
+
+def pixel_view(surface, rect=None):
+    # surface（或其中 rect 区域）像素的 (H, W, 3) uint8 视图，与 Surface 共享内存，不做拷贝。
+    # 视图存在期间 Surface 保持锁定：仍可 fill / draw，但不能参与 blit，下一帧绘制前先 del 掉
+    import pygame
+    px = pygame.surfarray.pixels3d(surface)
+    if rect is not None:
+        px = px[rect.left:rect.right, rect.top:rect.bottom]
+    return px.transpose(1, 0, 2)
+
+
+class Observer:
+    """单局（SnakeEngine 的 GameState）观测，update(state) 原地更新 planes / features。
+
+    planes、features 可以传入外部数组的一行（例如多局共用的 (N, C, H, W) 数组），必须是连续内存。
+    同一个 state 连续调用（ticks 每次加一）时只改动新头、旧头、旧尾与食物的格子，否则整体重建。
+    """
+
+    def __init__(self, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap", planes=None, features=None,
+                 dtype=np.float32):
+        if difficulty not in ("wrap", "wall"):
+            raise ValueError(f"unknown difficulty: {difficulty!r}")
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.wrap = difficulty == "wrap"
+        if planes is None:
+            planes = np.zeros((PLANES, grid_h, grid_w), dtype=dtype)
+        if features is None:
+            features = np.zeros(FEATURES, dtype=dtype)
+        if planes.shape != (PLANES, grid_h, grid_w) or not planes.flags.c_contiguous:
+            raise ValueError(f"planes must be a contiguous {PLANES}x{grid_h}x{grid_w} array")
+        if features.shape != (FEATURES,):
+            raise ValueError(f"features must have shape ({FEATURES},)")
+        self.planes = planes
+        self.features = features
+        self._flat = planes.reshape(PLANES, -1)
+        self._dir_value = np.arange(1, 5, dtype=planes.dtype) / 4
+        self._limits = ray_limits(grid_w, grid_h, self.wrap)
+        self._state = None
+        self._ticks = 0
+        self._head = self._tail = self._length = 0
+        self._food = -1
+
+    def _cell(self, pos):
+        return -1 if pos is None else pos[1] * self.grid_w + pos[0]
+
+    def update(self, state):
+        if state is self._state and state.ticks == self._ticks + 1:
+            self._advance(state)
+        elif state is not self._state or state.ticks != self._ticks:
+            self._rebuild(state)
+        else:
+            return self.planes, self.features
+        self._state = state
+        self._ticks = state.ticks
+        self._cast(state)
+        return self.planes, self.features
+
+    def _rebuild(self, state):
+        flat, w = self._flat, self.grid_w
+        cells = np.fromiter((y * w + x for x, y in state.snake), dtype=np.int64, count=len(state.snake))
+        flat[...] = 0
+        flat[BODY, cells] = 1
+        flat[HEAD, cells[0]] = 1
+        flat[DIR, cells[0]] = self._dir_value[state.direction]
+        flat[DIR, cells[1:]] = self._dir_value[towards(cells[1:], cells[:-1], w, self.grid_h, self.wrap)]
+        food = self._cell(state.food)
+        if food >= 0:
+            flat[FOOD, food] = 1
+        self._head = int(cells[0])
+        self._tail = int(cells[-1])
+        self._length = len(cells)
+        self._food = food
+
+    def _advance(self, state):
+        flat = self._flat
+        head = self._cell(state.snake[0])
+        d = self._dir_value[state.direction]
+        if head != self._head:  # 死亡的那个 tick 蛇不移动
+            if len(state.snake) == self._length:
+                # 没吃到食物：旧尾释放（新头可能正好走进这一格，所以先清后写）
+                flat[BODY, self._tail] = 0
+                flat[DIR, self._tail] = 0
+            flat[HEAD, self._head] = 0
+            flat[DIR, self._head] = d  # 旧头成为第二节，指向新头
+            flat[BODY, head] = 1
+            flat[HEAD, head] = 1
+            self._head = head
+            self._tail = self._cell(state.snake[-1])
+            self._length = len(state.snake)
+        flat[DIR, head] = d
+        food = self._cell(state.food)
+        if food != self._food:
+            if self._food >= 0:
+                flat[FOOD, self._food] = 0
+            if food >= 0:
+                flat[FOOD, food] = 1
+            self._food = food
+
+    def _cast(self, state):
+        w, h, wrap, occ = self.grid_w, self.grid_h, self.wrap, state.occ
+        hx, hy = state.snake[0]
+        food = self._food
+        values = [0.0] * FEATURES
+        values[state.direction] = 1.0
+        for r, (dx, dy) in enumerate(RAYS):
+            base = 4 + RAY_FEATURES * r
+            x, y = hx, hy
+            for k in range(1, self._limits[r] + 1):
+                x += dx
+                y += dy
+                if wrap:
+                    x %= w
+                    y %= h
+                elif not (0 <= x < w and 0 <= y < h):
+                    values[base + RAY_WALL] = 1 / k
+                    break
+                idx = y * w + x
+                if occ[idx] and not values[base + RAY_BODY]:
+                    values[base + RAY_BODY] = 1 / k
+                if idx == food:
+                    values[base + RAY_FOOD] = 1 / k
+        self.features[:] = values
+
+
+class VecObserver:
+    """VecSnake 的批量观测：planes (N, C, H, W) 与 features (N, F) 各是一块连续数组。
+
+    每次 env.step() 之后调用 update(done)：未结束的局只改动新头、旧头、旧尾与食物四处格子，
+    结束的局（VecSnake 已自动重开）按当前状态重建。rays=False 时不计算射线特征（方向 one-hot 照常更新）。
+    """
+
+    def __init__(self, env, dtype=np.float32, rays=True):
+        self.env = env
+        n, w, h = env.n, env.grid_w, env.grid_h
+        self.rays = rays
+        self.planes = np.zeros((n, PLANES, h, w), dtype=dtype)
+        self.features = np.zeros((n, FEATURES), dtype=dtype)
+        self._flat = self.planes.reshape(-1)
+        self._base = np.arange(n, dtype=np.int64) * (PLANES * env.cells)  # 每局在展平数组中的起点
+        self._dir_value = np.arange(1, 5, dtype=dtype) / 4
+        self._head = np.zeros(n, dtype=np.int32)
+        self._tail = np.zeros(n, dtype=np.int32)
+        self._food = np.zeros(n, dtype=np.int32)
+        self._ray_features = self.features[:, 4:].reshape(n, len(RAYS), RAY_FEATURES)  # 视图
+        # 各格出发的射线格子表，每 tick 只需按蛇头取一行；棋盘太大时改为每 tick 现算
+        steps = max(ray_limits(w, h, env.wrap))
+        self._table = ray_cells(w, h, env.wrap, np.arange(env.cells)) if env.cells * len(RAYS) * steps <= RAY_TABLE_SIZE else None
+        self._inv = np.zeros(max(w, h) + 2, dtype=dtype)  # _inv[k] = 1/k，_inv[0] = 0
+        self._inv[1:] = 1 / np.arange(1, max(w, h) + 2)
+        self.reset()
+
+    def reset(self):
+        # 整体重建；直接修改了 env 的状态（而不是通过 step）之后也应调用
+        self._rebuild(self.env.all)
+        self._cast()
+        return self.planes, self.features
+
+    def _rebuild(self, rows):
+        env, cells = self.env, self.env.cells
+        planes = self.planes.reshape(env.n, PLANES, cells)
+        planes[rows] = 0
+        planes[rows, BODY] = env.occ[rows, :cells]
+        length, head_ptr = env.length[rows], env.head_ptr[rows]
+        # 从蛇头往尾逐节写方向；重开的局只有 3 节
+        prev = env.body[rows, head_ptr]
+        planes[rows, HEAD, prev] = 1
+        planes[rows, DIR, prev] = self._dir_value[env.direction[rows]]
+        for k in range(1, int(length.max())):
+            cur = env.body[rows, (head_ptr - k) % cells]
+            live = k < length
+            d = towards(cur[live], prev[live], env.grid_w, env.grid_h, env.wrap)
+            planes[rows[live], DIR, cur[live]] = self._dir_value[d]
+            prev = cur
+        food = env.food[rows]
+        ok = food >= 0
+        planes[rows[ok], FOOD, food[ok]] = 1
+        self._head[rows] = env.body[rows, head_ptr]
+        self._tail[rows] = env.body[rows, env.tail_ptr[rows]]
+        self._food[rows] = food
+
+    def update(self, done):
+        env, cells, flat = self.env, self.env.cells, self._flat
+        done = np.asarray(done, dtype=bool)
+        live = env.all[~done] if done.any() else env.all
+        base = self._base[live]
+        head = env.body[live, env.head_ptr[live]]
+        tail = env.body[live, env.tail_ptr[live]]
+        old_head, old_tail, old_food = self._head[live], self._tail[live], self._food[live]
+        d = self._dir_value[env.direction[live]]
+
+        # 未结束的局每个 tick 都移动了一格；没吃到食物的旧尾先清，新头可能正好是这一格
+        shrink = tail != old_tail
+        freed = base[shrink] + old_tail[shrink]
+        flat[freed + BODY * cells] = 0
+        flat[freed + DIR * cells] = 0
+        flat[base + HEAD * cells + old_head] = 0
+        flat[base + DIR * cells + old_head] = d
+        flat[base + BODY * cells + head] = 1
+        flat[base + HEAD * cells + head] = 1
+        flat[base + DIR * cells + head] = d
+
+        # 食物只在吃到时移动；棋盘占满（food = -1）的局已经结束，不会走到这里
+        food = env.food[live]
+        moved = food != old_food
+        flat[base[moved] + FOOD * cells + old_food[moved]] = 0
+        flat[base[moved] + FOOD * cells + food[moved]] = 1
+
+        self._head[live] = head
+        self._tail[live] = tail
+        self._food[live] = food
+        if len(live) < env.n:
+            self._rebuild(env.all[done])
+        self._cast()
+        return self.planes, self.features
+
+    def _cast(self):
+        env, f = self.env, self.features
+        f[:, :4] = 0
+        f[env.all, env.direction] = 1
+        if not self.rays:
+            return
+        cells, inv = env.cells, self._inv
+        idx = self._table[self._head] if self._table is not None else ray_cells(env.grid_w, env.grid_h, env.wrap, self._head)
+        valid = idx != cells
+        if not env.wrap:
+            # 撞墙模式下射线一直走到边界，有效步数 + 1 即到墙的距离
+            self._ray_features[:, :, RAY_WALL] = inv[valid.sum(axis=2) + 1]
+        # 每条射线上第一个命中的位置；argmax 在全为 False 时返回 0，用 has 区分
+        for feature, hit in ((RAY_BODY, (env.occ.reshape(-1)[env.row[:, None, None] + idx] != 0) & valid),
+                             (RAY_FOOD, idx == env.food[:, None, None])):
+            first = hit.argmax(axis=2)
+            has = np.take_along_axis(hit, first[..., None], axis=2)[..., 0]
+            self._ray_features[:, :, feature] = np.where(has, inv[first + 1], 0)
@@ -0,0 +1,128 @@
+import json
+import time
+import atexit
+from collections import deque
+
+import pygame
+
+# 帧分析器：记录每帧各阶段耗时，可在屏幕上叠加显示，也可逐帧导出为 CSV / JSONL
+# 未启用时每个埋点只是一次属性判断后返回
+
+PHASES = ("events", "logic", "grid", "snake", "text", "overlay", "present")
+OVERLAY_REFRESH = 0.25  # 叠加层文字刷新间隔（秒），避免每帧重新栅格化
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+class FrameProfiler:
+    def __init__(self, window=300):
+        self.enabled = False   # 是否采集（开启叠加层或导出时为 True）
+        self.overlay = False   # 是否显示叠加层
+        self.active = False    # 本帧是否在采集；只在帧边界跟随 enabled 变化
+        self.frames = deque(maxlen=window)  # (帧间隔, 本帧耗时, 各阶段耗时)
+        self.frame_no = 0
+        self.out = None
+        self.out_format = None
+        self.overlay_surf = None
+        self.overlay_time = 0.0
+        self._cur = None
+        self._start = self._last = self._interval = 0.0
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.out is not None
+        self.overlay_surf = None
+
+    def open_export(self, path):
+        # 按扩展名选择格式：.csv 或 .jsonl
+        self.out_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        self.out = open(path, "w", encoding="utf-8", newline="")
+        if self.out_format == "csv":
+            self.out.write("frame,interval_ms,total_ms," + ",".join(f"{p}_ms" for p in PHASES) + "\n")
+        self.enabled = True
+        atexit.register(self.close)
+
+    def close(self):
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+    def begin(self, interval):
+        # interval 为距上一帧开始的真实时间（秒），用于计算 FPS
+        self.active = self.enabled
+        if not self.active:
+            return
+        self._start = self._last = time.perf_counter()
+        self._interval = interval
+        self._cur = dict.fromkeys(PHASES, 0.0)
+
+    def mark(self, phase):
+        # 把距上一个埋点的耗时计入 phase
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self._cur[phase] += now - self._last
+        self._last = now
+
+    def end(self):
+        if not self.active:
+            return
+        total = time.perf_counter() - self._start
+        self.frames.append((self._interval, total, self._cur))
+        self.frame_no += 1
+        if self.out is not None:
+            if self.out_format == "csv":
+                row = [str(self.frame_no), f"{self._interval * 1000:.3f}", f"{total * 1000:.3f}"]
+                row += [f"{self._cur[p] * 1000:.3f}" for p in PHASES]
+                self.out.write(",".join(row) + "\n")
+            else:
+                self.out.write(json.dumps({
+                    "frame": self.frame_no,
+                    "interval_ms": round(self._interval * 1000, 3),
+                    "total_ms": round(total * 1000, 3),
+                    "phases": {p: round(v * 1000, 3) for p, v in self._cur.items()},
+                }) + "\n")
+
+    def stats(self):
+        if not self.frames:
+            return None
+        intervals = sum(f[0] for f in self.frames)
+        totals = sorted(f[1] for f in self.frames)
+        n = len(self.frames)
+        return {
+            "fps": n / intervals if intervals > 0 else 0.0,
+            "p50": percentile(totals, 50) * 1000,
+            "p95": percentile(totals, 95) * 1000,
+            "p99": percentile(totals, 99) * 1000,
+            "phases": {p: sum(f[2][p] for f in self.frames) / n * 1000 for p in PHASES},
+        }
+
+    def overlay_surface(self, font):
+        # 叠加层按 OVERLAY_REFRESH 间隔重建，其余帧复用同一个 Surface
+        now = time.perf_counter()
+        if self.overlay_surf is not None and now - self.overlay_time < OVERLAY_REFRESH:
+            return self.overlay_surf
+        self.overlay_time = now
+        st = self.stats()
+        if st is None:
+            lines = ["FPS --"]
+        else:
+            lines = [f"FPS {st['fps']:.1f}",
+                     f"p50 {st['p50']:.2f}  p95 {st['p95']:.2f}  p99 {st['p99']:.2f} ms"]
+            lines += [f"{p:<8} {st['phases'][p]:.3f} ms" for p in PHASES]
+        surfs = [font.render(line, True, (255, 255, 0)) for line in lines]
+        w = max(s.get_width() for s in surfs) + 8
+        h = sum(s.get_height() for s in surfs) + 8
+        panel = pygame.Surface((w, h), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        y = 4
+        for s in surfs:
+            panel.blit(s, (4, y))
+            y += s.get_height()
+        self.overlay_surf = panel
+        return panel
@@ -0,0 +1,207 @@
+import sys
+import struct
+import time
+import argparse
+from array import array
+
+from snake_engine import SnakeEngine, index_typecode
+
+# 回放文件格式（小端）：
+#   头部  magic "SNKR" | 版本 u8 | 宽 u16 | 高 u16 | 难度 u8 | 基础速度 u8 | 种子 u64 | tick 数 u32 | 最终分数 u32
+#   数据  每 tick 一个方向编码（0 上 1 右 2 下 3 左），2 bit 一个，每字节 4 个，低位在前
+# 记录的是该 tick 实际生效的方向，回放时原样传给 SnakeEngine.step() 即可复现
+
+MAGIC = b"SNKR"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHBBQII")
+DIFFICULTY_CODES = {"wrap": 0, "wall": 1}
+DIFFICULTY_NAMES = {v: k for k, v in DIFFICULTY_CODES.items()}
+CHECKPOINT_EVERY = 1000  # 回放定位用的状态检查点间隔（tick），大棋盘按 CHECKPOINT_BUDGET 放宽
+CHECKPOINT_BUDGET = 64 * 1024 * 1024  # 一局回放的检查点总共大约占用的内存上限（字节）
+
+
+class ReplayRecorder:
+    def __init__(self, grid_w, grid_h, difficulty, base_speed, seed):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.difficulty = difficulty
+        self.base_speed = base_speed
+        self.seed = seed
+        self.ticks = 0
+        self.score = 0
+        self.data = bytearray()
+
+    def record(self, state):
+        # 在每次 step() 之后调用
+        i = self.ticks
+        if i % 4 == 0:
+            self.data.append(0)
+        self.data[-1] |= state.direction << ((i % 4) * 2)
+        self.ticks += 1
+        self.score = state.score
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.grid_w, self.grid_h, DIFFICULTY_CODES[self.difficulty],
+                             self.base_speed, self.seed, self.ticks, self.score)
+        return header + bytes(self.data)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+
+class Replay:
+    def __init__(self, grid_w, grid_h, difficulty, base_speed, seed, ticks, score, data):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.difficulty = difficulty
+        self.base_speed = base_speed
+        self.seed = seed
+        self.ticks = ticks
+        self.score = score  # 录制时的最终分数，用于校验规则改动
+        self.data = data
+
+    @classmethod
+    def from_bytes(cls, blob):
+        if len(blob) < HEADER.size:
+            raise ValueError("replay too short")
+        magic, version, w, h, diff, speed, seed, ticks, score = HEADER.unpack_from(blob)
+        if magic != MAGIC:
+            raise ValueError("not a snake replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version: {version}")
+        # 头部字段会用作下标或除数，损坏的文件在这里就报 ValueError，而不是回放时才出错
+        if diff not in DIFFICULTY_NAMES:
+            raise ValueError(f"unknown difficulty code: {diff}")
+        if w < 1 or h < 5:
+            raise ValueError(f"grid too small: {w}x{h}")
+        if speed < 1:
+            raise ValueError(f"invalid base speed: {speed}")
+        data = blob[HEADER.size:]
+        if len(data) != (ticks + 3) // 4:
+            raise ValueError("replay data length does not match tick count")
+        return cls(w, h, DIFFICULTY_NAMES[diff], speed, seed, ticks, score, data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def direction(self, i):
+        return (self.data[i >> 2] >> ((i & 3) * 2)) & 3
+
+    def make_engine(self):
+        engine = SnakeEngine(self.grid_w, self.grid_h, self.difficulty)
+        engine.reset(self.seed)
+        return engine
+
+
+def checkpoint_interval(replay):
+    # 每个检查点复制占用网格和空闲格索引，约每格 (1 + 2 * 下标字节数) 字节；
+    # 间隔至少 CHECKPOINT_EVERY，并放宽到整局检查点总量不超过 CHECKPOINT_BUDGET
+    cells = replay.grid_w * replay.grid_h
+    snap_bytes = cells * (1 + 2 * array(index_typecode(cells)).itemsize)
+    budget_count = max(1, CHECKPOINT_BUDGET // snap_bytes)
+    return max(CHECKPOINT_EVERY, -(-replay.ticks // budget_count))
+
+
+class ReplayPlayer:
+    """逐 tick 回放；seek() 从最近的检查点恢复再重新模拟，不必从头开始。
+
+    checkpoint_every 为 None 时不保存检查点（只需要最终结果时用），向回 seek 会从开局重新模拟。
+    """
+
+    def __init__(self, replay, checkpoint_every="auto"):
+        self.replay = replay
+        if checkpoint_every == "auto":
+            checkpoint_every = checkpoint_interval(replay)
+        self.checkpoint_every = checkpoint_every
+        self.engine = replay.make_engine()
+        self.state = self.engine.state
+        self.checkpoints = [] if checkpoint_every is None else [self.engine.snapshot()]
+
+    @property
+    def tick(self):
+        return self.state.ticks
+
+    @property
+    def done(self):
+        return self.state.ticks >= self.replay.ticks or not self.state.alive
+
+    def step(self):
+        if self.done:
+            return self.state
+        self.state, _, _ = self.engine.step(self.replay.direction(self.state.ticks))
+        every = self.checkpoint_every
+        if every is not None and self.state.ticks % every == 0 and self.state.ticks // every == len(self.checkpoints):
+            self.checkpoints.append(self.engine.snapshot())
+        return self.state
+
+    def seek(self, tick):
+        tick = max(0, min(tick, self.replay.ticks))
+        if tick < self.state.ticks:
+            if self.checkpoints:
+                k = min(tick // self.checkpoint_every, len(self.checkpoints) - 1)
+                self.state = self.engine.restore(self.checkpoints[k])
+            else:
+                self.state = self.engine.reset(self.replay.seed)
+        while self.state.ticks < tick and not self.done:
+            self.step()
+        return self.state
+
+    def run(self):
+        # 全速跑完整局
+        engine, replay, state = self.engine, self.replay, self.state
+        step, direction = engine.step, replay.direction
+        every = self.checkpoint_every
+        if every is None:
+            while state.ticks < replay.ticks and state.alive:
+                state, _, _ = step(direction(state.ticks))
+        else:
+            while state.ticks < replay.ticks and state.alive:
+                state, _, _ = step(direction(state.ticks))
+                if state.ticks % every == 0 and state.ticks // every == len(self.checkpoints):
+                    self.checkpoints.append(engine.snapshot())
+        self.state = state
+        return state
+
+
+def verify(replay):
+    # 重新模拟整局，确认结果与录制时一致；只要最终状态，不保存检查点
+    state = ReplayPlayer(replay, checkpoint_every=None).run()
+    return state.ticks == replay.ticks and state.score == replay.score, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面回放贪吃蛇录像并校验结果")
+    parser.add_argument("files", nargs="+", help="回放文件")
+    parser.add_argument("--seek", type=int, default=None, help="只模拟到指定 tick 并输出状态")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    total_ticks = 0
+    t0 = time.perf_counter()
+    for path in args.files:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ValueError) as e:
+            print(f"{path}: error: {e}")
+            failed += 1
+            continue
+        if args.seek is not None:
+            state = ReplayPlayer(replay).seek(args.seek)
+            print(f"{path}: tick={state.ticks} score={state.score} length={len(state.snake)} alive={state.alive}")
+            total_ticks += state.ticks
+            continue
+        ok, state = verify(replay)
+        total_ticks += state.ticks
+        if not ok:
+            failed += 1
+        print(f"{path}: {'ok' if ok else 'MISMATCH'} ticks={state.ticks}/{replay.ticks} score={state.score}/{replay.score}")
+    elapsed = time.perf_counter() - t0
+    print(f"{len(args.files)} replays, {total_ticks} ticks in {elapsed:.3f}s ({total_ticks / max(elapsed, 1e-9):.0f} ticks/s), {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
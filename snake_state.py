@@ -0,0 +1,289 @@
+import sys
+import struct
+from array import array
+
+from snake_engine import GRID_W, GRID_H, UP, DIRECTIONS, REWARD_FOOD, REWARD_DEATH
+
+# 紧凑状态：蛇身是格子下标（y*W+x）的 array('H') 环形缓冲，占用是按位打包的位图，
+# 食物由状态内的 64 位随机数（splitmix64）决定，所以整个局面连同随机数都能写成一段稳定的 bytes。
+# 规则与 SnakeEngine 相同，但食物序列不同（与 VecSnake 一样，不能用来复现 SnakeEngine 的对局）。
+# snapshot() / restore() 基于撤销日志：快照只记下日志长度，回滚只撤销之后的 tick，与棋盘大小和蛇长无关。
+
+ALIVE, DEAD_WALL, DEAD_SELF, WON = 0, 1, 2, 3
+DEATH_NAMES = {DEAD_WALL: "wall", DEAD_SELF: "self"}
+
+# 序列化格式（小端）：
+#   头部  magic "SNKS" | 版本 u8 | 宽 u16 | 高 u16 | 包裹 u8 | 方向 u8 | 状态 u8 | 食物 i32 | 分数 u32 | tick 数 u32
+#         | 随机数状态 u64 | 蛇长 u32
+#   数据  蛇身格子下标，从尾到头；格子数不超过 65536 时每个 u16，否则 u32
+MAGIC = b"SNKS"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHBBBiIIQI")
+MAX_CELLS = 4000 * 4000  # from_bytes 接受的最大棋盘格数，防止损坏的头部触发巨量分配
+FOOD_TRIES = 8  # 随机抽格子的次数，全部落在蛇身上再按位图精确抽取
+MASK64 = (1 << 64) - 1
+ZEROS = bytes(8 - bin(b).count("1") for b in range(256))  # 每个字节中 0 位的个数
+
+
+class CompactState:
+    """可快速快照 / 回滚的单局状态，step() 原地推进。
+
+    body   环形缓冲，body[head] 为蛇头，往前 length 个为蛇身（负下标即环绕）
+    bits   占用位图，第 i 格为 bits[i >> 3] 的第 i & 7 位
+    log    撤销日志，None 表示未开启；每个 tick 追加一条，restore() 逆序撤销
+    """
+
+    __slots__ = ("grid_w", "grid_h", "cells", "wrap", "body", "head", "length", "bits",
+                 "direction", "food", "score", "ticks", "status", "seed", "log")
+
+    def __init__(self, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap", seed=0):
+        if difficulty not in ("wrap", "wall"):
+            raise ValueError(f"unknown difficulty: {difficulty!r}")
+        if grid_w < 1 or grid_h < 5:
+            raise ValueError(f"grid too small: {grid_w}x{grid_h}")
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.cells = grid_w * grid_h
+        self.wrap = difficulty == "wrap"
+        self.body = array(self._typecode(self.cells), [0]) * self.cells
+        self.bits = bytearray((self.cells + 7) >> 3)
+        self.reset(seed)
+
+    @staticmethod
+    def _typecode(cells):
+        return "H" if cells <= 0x10000 else "I"
+
+    def reset(self, seed=0):
+        # 初始蛇与 SnakeEngine 相同：身体在蛇头下方，方向向上
+        w, h = self.grid_w, self.grid_h
+        self.bits[:] = bytes(len(self.bits))
+        start = [(h // 2 + i) * w + w // 2 for i in range(3)]
+        for i, c in enumerate(reversed(start)):
+            self.body[i] = c
+            self.bits[c >> 3] |= 1 << (c & 7)
+        self.head = len(start) - 1
+        self.length = len(start)
+        self.direction = UP
+        self.score = 0
+        self.ticks = 0
+        self.status = ALIVE
+        self.seed = seed & MASK64
+        self.log = None
+        self.food = self._place_food()
+        return self
+
+    @property
+    def alive(self):
+        return self.status == ALIVE
+
+    @property
+    def won(self):
+        return self.status == WON
+
+    @property
+    def death(self):
+        return DEATH_NAMES.get(self.status)
+
+    def occupied(self, idx):
+        return self.bits[idx >> 3] >> (idx & 7) & 1
+
+    def snake_cells(self):
+        # 蛇身格子下标，head first
+        body, head = self.body, self.head
+        return [body[head - i] for i in range(self.length)]
+
+    def _rand(self, n):
+        # splitmix64，状态只有一个整数，快照与序列化都不必另存随机数生成器
+        self.seed = s = (self.seed + 0x9E3779B97F4A7C15) & MASK64
+        z = ((s ^ (s >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return (z ^ (z >> 31)) % n
+
+    def _place_food(self):
+        free = self.cells - self.length
+        if not free:
+            return -1
+        bits = self.bits
+        for _ in range(FOOD_TRIES):
+            c = self._rand(self.cells)
+            if not bits[c >> 3] >> (c & 7) & 1:
+                return c
+        # 蛇很长时在空闲格中取第 k 个：按字节跳过，最后一个字节的填充位在有效格之后，不会被选中
+        k = self._rand(free)
+        for i, b in enumerate(bits):
+            z = ZEROS[b]
+            if k < z:
+                for j in range(8):
+                    if not b >> j & 1:
+                        if not k:
+                            return (i << 3) + j
+                        k -= 1
+            k -= z
+        return -1
+
+    def step(self, action=None):
+        # action 为方向编码；None 表示保持当前方向，反向输入被忽略。返回 (reward, done)
+        if self.status:
+            return 0, True
+        cells, body, bits = self.cells, self.body, self.bits
+        head, length, direction = self.head, self.length, self.direction
+        nxt = head + 1 if head + 1 < cells else 0
+        if self.log is not None:
+            # 撤销所需的全部信息：被覆盖的环形缓冲槽位及各标量
+            self.log.append((head, length, direction, self.food, self.score, self.seed, body[nxt]))
+        if action is not None and action != (direction + 2) % 4:
+            self.direction = direction = action
+        self.ticks += 1
+
+        w = self.grid_w
+        cur = body[head]
+        dx, dy = DIRECTIONS[direction]
+        x, y = cur % w + dx, cur // w + dy
+        if self.wrap:
+            x %= w
+            y %= self.grid_h
+        elif not (0 <= x < w and 0 <= y < self.grid_h):
+            self.status = DEAD_WALL
+            return REWARD_DEATH, True
+
+        # 尾巴在同一 tick 会移走，所以（不吃食物时）可以走进尾巴原来的格子
+        new = y * w + x
+        eating = new == self.food
+        tail = body[head - length + 1]
+        if bits[new >> 3] >> (new & 7) & 1 and (eating or new != tail):
+            self.status = DEAD_SELF
+            return REWARD_DEATH, True
+
+        if not eating:
+            bits[tail >> 3] &= ~(1 << (tail & 7))
+        body[nxt] = new
+        bits[new >> 3] |= 1 << (new & 7)
+        self.head = nxt
+        if not eating:
+            return 0, False
+
+        self.length = length + 1
+        self.score += 1
+        self.food = self._place_food()
+        if self.food < 0:
+            self.status = WON  # 棋盘已满
+        return REWARD_FOOD, self.status == WON
+
+    # 快照只是撤销日志的长度，O(1)；第一次快照时开启日志
+    def snapshot(self):
+        if self.log is None:
+            self.log = []
+        return len(self.log)
+
+    def restore(self, token):
+        log, body, bits = self.log, self.body, self.bits
+        while len(log) > token:
+            head, length, direction, food, score, seed, slot = log.pop()
+            if self.status in (ALIVE, WON):
+                # 该 tick 移动过：撤掉新头；没吃到食物时尾巴被释放过，放回去
+                new = body[self.head]
+                bits[new >> 3] &= ~(1 << (new & 7))
+                if self.length == length:
+                    tail = body[head - length + 1]
+                    bits[tail >> 3] |= 1 << (tail & 7)
+                body[self.head] = slot
+            self.head = head
+            self.length = length
+            self.direction = direction
+            self.food = food
+            self.score = score
+            self.seed = seed
+            self.status = ALIVE
+            self.ticks -= 1
+        return self
+
+    def drop_log(self):
+        # 不再需要回滚时关闭日志，之前的快照全部失效
+        self.log = None
+
+    def copy(self):
+        other = CompactState.__new__(CompactState)
+        for name in CompactState.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.body = array(self.body.typecode, self.body)
+        other.bits = bytearray(self.bits)
+        other.log = None
+        return other
+
+    def to_bytes(self):
+        # 与环形缓冲的起点、撤销日志无关：同一局面总是得到同一段 bytes，可直接用于哈希与缓存
+        body, head = self.body, self.head
+        start = head - self.length + 1
+        seg = body[start:head + 1] if start >= 0 else body[start:] + body[:head + 1]
+        if sys.byteorder == "big":
+            seg.byteswap()
+        header = HEADER.pack(MAGIC, VERSION, self.grid_w, self.grid_h, self.wrap, self.direction, self.status,
+                             self.food, self.score, self.ticks, self.seed, self.length)
+        return header + seg.tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        if len(blob) < HEADER.size:
+            raise ValueError("state too short")
+        magic, version, w, h, wrap, direction, status, food, score, ticks, seed, length = HEADER.unpack_from(blob)
+        if magic != MAGIC:
+            raise ValueError("not a compact snake state")
+        if version != VERSION:
+            raise ValueError(f"unsupported state version: {version}")
+        if status not in (ALIVE, DEAD_WALL, DEAD_SELF, WON):
+            raise ValueError(f"unknown state status: {status}")
+        if direction >= 4:
+            raise ValueError(f"invalid direction: {direction}")
+        # 先按头部核对尺寸与数据长度，再分配与棋盘等大的数组
+        cells = w * h
+        if cells > MAX_CELLS:
+            raise ValueError(f"grid too large: {w}x{h}")
+        if not 0 < length <= cells:
+            raise ValueError(f"snake length out of range: {length}")
+        typecode = cls._typecode(cells)
+        if len(blob) - HEADER.size != length * array(typecode).itemsize:
+            raise ValueError("state body length does not match header")
+        if not -1 <= food < cells:
+            raise ValueError(f"food cell out of range: {food}")
+        st = cls(w, h, "wrap" if wrap else "wall")
+        seg = array(typecode)
+        seg.frombytes(blob[HEADER.size:])
+        if sys.byteorder == "big":
+            seg.byteswap()
+        st.bits[:] = bytes(len(st.bits))
+        bits = st.bits
+        for i, c in enumerate(seg):
+            if c >= cells:
+                raise ValueError(f"body cell out of range: {c}")
+            if bits[c >> 3] & (1 << (c & 7)):
+                raise ValueError(f"body cell repeated: {c}")
+            st.body[i] = c
+            bits[c >> 3] |= 1 << (c & 7)
+        st.head = length - 1
+        st.length = length
+        st.direction = direction
+        st.food = food
+        st.score = score
+        st.ticks = ticks
+        st.status = status
+        st.seed = seed
+        return st
+
+    @classmethod
+    def from_game_state(cls, state, grid_w, grid_h, difficulty, seed=0):
+        # 从 SnakeEngine 的 GameState 转换（例如给 AI 做前瞻搜索）；之后的食物由 seed 决定
+        st = cls(grid_w, grid_h, difficulty)
+        st.bits[:] = bytes(len(st.bits))
+        for i, (x, y) in enumerate(reversed(state.snake)):
+            c = y * grid_w + x
+            st.body[i] = c
+            st.bits[c >> 3] |= 1 << (c & 7)
+        st.head = len(state.snake) - 1
+        st.length = len(state.snake)
+        st.direction = state.direction
+        st.food = -1 if state.food is None else state.food[1] * grid_w + state.food[0]
+        st.score = state.score
+        st.ticks = state.ticks
+        st.status = WON if state.won else {None: ALIVE, "wall": DEAD_WALL, "self": DEAD_SELF}[state.death]
+        st.seed = seed & MASK64
+        return st
@@ -0,0 +1,201 @@
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from snake_engine import GRID_W, GRID_H, DIRECTIONS, REWARD_FOOD, REWARD_DEATH
+
+# 批量环境：N 局游戏以 NumPy 数组保存，一次调用推进全部 N 局，结束的局自动重开
+# 规则与 SnakeEngine 相同（包裹/撞墙、尾巴同 tick 释放、吃到食物 +1 分、占满棋盘为胜利），
+# 但食物位置由 NumPy 随机数生成器决定，同一种子下与 SnakeEngine 的局面序列并不相同
+
+DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+
+# 结束原因编码
+DEATH_NONE, DEATH_WALL, DEATH_SELF, DEATH_WIN = 0, 1, 2, 3
+
+
+class VecSnake:
+    """N 个棋盘的批量贪吃蛇。
+
+    occ      (N, W*H+1) uint8  占用平面（格子下标 y*W+x），最后一列是无效写入用的占位格
+    body     (N, W*H+1) int32  蛇身环形缓冲，head_ptr 指向蛇头、tail_ptr 指向蛇尾，最后一列同为占位
+    food     (N,)       int32  食物格子下标，-1 表示棋盘已满
+    head_x, head_y      int32  蛇头坐标（避免每 tick 做除法）
+
+    step() 对所有局做无分支的整体写入：不需要写的局写到占位格，省去布尔掩码取子集的开销。
+    """
+
+    def __init__(self, n, grid_w=GRID_W, grid_h=GRID_H, difficulty="wrap", seed=None):
+        if difficulty not in ("wrap", "wall"):
+            raise ValueError(f"unknown difficulty: {difficulty!r}")
+        if grid_w < 1 or grid_h < 5:
+            raise ValueError(f"grid too small: {grid_w}x{grid_h}")
+        self.n = n
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.cells = cells = grid_w * grid_h
+        self.wrap = difficulty == "wrap"
+        self.rng = np.random.default_rng(seed)
+        self.all = np.arange(n)
+        self.row = self.all.astype(np.int64) * (cells + 1)  # 每局在展平数组中的起点
+
+        self.occ = np.zeros((n, cells + 1), dtype=np.uint8)
+        self.body = np.zeros((n, cells + 1), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int32)
+        self.tail_ptr = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.head_x = np.zeros(n, dtype=np.int32)
+        self.head_y = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int32)
+        self.food = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self._occ_flat = self.occ.reshape(-1)
+        self._body_flat = self.body.reshape(-1)
+        self._no_wall = np.zeros(n, dtype=bool)
+
+        # 本次 step 中结束的局的结果（仅 done 为 True 的位置有效）
+        self.final_score = np.zeros(n, dtype=np.int32)
+        self.final_ticks = np.zeros(n, dtype=np.int32)
+        self.death = np.zeros(n, dtype=np.int8)
+
+        # 初始蛇（与 SnakeEngine 相同：head first，身体在 head 下方，方向向上）
+        w, h = grid_w, grid_h
+        self.start_cells = np.array([(h // 2 + i) * w + w // 2 for i in range(3)], dtype=np.int32)
+        self.reset()
+
+    def reset(self, idx=None):
+        idx = self.all if idx is None else idx
+        if not len(idx):
+            return
+        start = self.start_cells
+        self.occ[idx] = 0
+        self.occ[idx[:, None], start[None, :]] = 1
+        # 环形缓冲从尾到头依次存放
+        self.body[idx, :len(start)] = start[::-1]
+        self.head_ptr[idx] = len(start) - 1
+        self.tail_ptr[idx] = 0
+        self.length[idx] = len(start)
+        self.head_x[idx] = start[0] % self.grid_w
+        self.head_y[idx] = start[0] // self.grid_w
+        self.direction[idx] = 0
+        self.score[idx] = 0
+        self.ticks[idx] = 0
+        self._place_food(idx)
+
+    def _place_food(self, idx):
+        # 先整体拒绝采样几轮（蛇短时几乎一次成功），剩下的逐局在空闲格里精确抽取
+        pending = idx
+        for _ in range(8):
+            cand = self.rng.integers(0, self.cells, size=len(pending), dtype=np.int32)
+            ok = self.occ[pending, cand] == 0
+            self.food[pending[ok]] = cand[ok]
+            pending = pending[~ok]
+            if not len(pending):
+                return
+        for g in pending:
+            free = np.flatnonzero(self.occ[g, :self.cells] == 0)
+            self.food[g] = self.rng.choice(free) if len(free) else -1
+
+    def step(self, actions=None):
+        # actions 为 (N,) 方向编码，-1 表示保持；反向输入被忽略。返回 (reward, done)
+        w, h, cells, row = self.grid_w, self.grid_h, self.cells, self.row
+        occ, body = self._occ_flat, self._body_flat
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int32)
+            turn = (actions >= 0) & (actions != (self.direction ^ 2))  # 0/2、1/3 互为反向
+            np.copyto(self.direction, actions, where=turn)
+        self.ticks += 1
+
+        nx = self.head_x + DX[self.direction]
+        ny = self.head_y + DY[self.direction]
+        if self.wrap:
+            nx %= w
+            ny %= h
+            wall = self._no_wall
+        else:
+            wall = (nx < 0) | (nx >= w) | (ny < 0) | (ny >= h)
+            np.clip(nx, 0, w - 1, out=nx)
+            np.clip(ny, 0, h - 1, out=ny)
+        new = ny * w + nx
+
+        eating = new == self.food
+        tail = body[row + self.tail_ptr]
+        # 尾巴在同一 tick 会移走，所以（不吃食物时）可以走进尾巴原来的格子
+        dead = (occ[row + new] == 1) & (eating | (new != tail))
+        dead |= wall
+        move = ~dead
+        shrink = move & ~eating
+        grow = move & eating
+
+        # 释放尾巴、占用新头；不需要写的局写到占位格 cells
+        occ[row + np.where(shrink, tail, cells)] = 0
+        occ[row + np.where(move, new, cells)] = 1
+        self.tail_ptr += shrink
+        self.tail_ptr[self.tail_ptr == cells] = 0
+        self.head_ptr += move
+        self.head_ptr[self.head_ptr == cells] = 0
+        body[row + np.where(move, self.head_ptr, cells)] = new
+        np.copyto(self.head_x, nx, where=move)
+        np.copyto(self.head_y, ny, where=move)
+
+        self.length += grow
+        self.score += grow
+        reward = np.where(dead, REWARD_DEATH, grow * REWARD_FOOD)
+
+        done = dead
+        if grow.any():
+            eaters = self.all[grow]
+            self._place_food(eaters)
+            won = np.zeros(self.n, dtype=bool)
+            won[eaters] = self.food[eaters] < 0
+            done = dead | won
+        else:
+            won = None
+        if done.any():
+            finished = self.all[done]
+            self.final_score[finished] = self.score[finished]
+            self.final_ticks[finished] = self.ticks[finished]
+            death = np.where(wall[finished], DEATH_WALL, DEATH_SELF)
+            if won is not None:
+                death[won[finished]] = DEATH_WIN
+            self.death[finished] = death
+            self.reset(finished)
+        return reward, done
+
+    def snake_cells(self, g):
+        # 第 g 局的蛇身格子下标（head first），调试/绘制用
+        ptr, length = self.head_ptr[g], self.length[g]
+        return self.body[g, (ptr - np.arange(length)) % self.cells]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量环境吞吐测试（随机动作）")
+    parser.add_argument("--n", type=int, default=10000, help="并行局数")
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--grid", default=f"{GRID_W}x{GRID_H}", help="棋盘大小，如 30x20")
+    parser.add_argument("--difficulty", choices=("wrap", "wall"), default="wrap")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    w, h = (int(v) for v in args.grid.lower().split("x"))
+
+    env = VecSnake(args.n, w, h, args.difficulty, args.seed)
+    rng = np.random.default_rng(args.seed)
+    # 预先生成动作，测量时只计 step()
+    actions = rng.integers(-1, 4, size=(args.ticks, args.n), dtype=np.int32)
+    games = 0
+    t0 = time.perf_counter()
+    for t in range(args.ticks):
+        _, done = env.step(actions[t])
+        games += int(done.sum())
+    elapsed = time.perf_counter() - t0
+    rate = args.n * args.ticks / elapsed
+    print(f"{args.n} boards x {args.ticks} ticks in {elapsed:.3f}s: {rate:,.0f} board-ticks/s, {games} games finished")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
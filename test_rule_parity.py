@@ -0,0 +1,164 @@
+import random
+import unittest
+from collections import deque
+
+from snake_engine import SnakeEngine, UP
+from snake_net import Room
+from snake_state import CompactState
+
+try:
+    import numpy as np
+    from snake_vec import VecSnake, DEATH_WALL, DEATH_SELF, DEATH_WIN
+except ImportError:
+    np = None
+
+# 规则一致性检查：移动、包裹/撞墙、自撞、尾巴同 tick 释放在 SnakeEngine 之外还各实现了一份
+# （VecSnake.step、CompactState.step、Room.step）。以 SnakeEngine 为基准，用相同的随机动作逐 tick 推进，
+# 每 tick 把食物强制设成 SnakeEngine 的落点，再比较蛇身、方向、分数与结束原因。
+# 运行：python -m pytest -q  或  python test_rule_parity.py
+
+BOARDS = [(8, 6, "wrap"), (8, 6, "wall"), (5, 5, "wrap"), (12, 7, "wall")]
+GAMES = 40
+MAX_TICKS = 2000
+TURN_P = 0.3  # 每 tick 转向的概率，其余 tick 保持方向
+
+
+def cells_of(snake, w):
+    # SnakeEngine 的 (x, y) 蛇身 -> 格子下标列表，head first
+    return [y * w + x for x, y in snake]
+
+
+def food_of(state, w):
+    return -1 if state.food is None else state.food[1] * w + state.food[0]
+
+
+def random_action(rng):
+    return rng.randrange(4) if rng.random() < TURN_P else None
+
+
+@unittest.skipIf(np is None, "numpy 未安装")
+class VecSnakeParity(unittest.TestCase):
+    def run_board(self, w, h, difficulty):
+        death_codes = {"wall": DEATH_WALL, "self": DEATH_SELF}
+        rng = random.Random(f"vec-{w}x{h}-{difficulty}")
+        n = 8
+        engines = [SnakeEngine(w, h, difficulty) for _ in range(n)]
+        states = [e.reset(rng.randrange(2**32)) for e in engines]
+        env = VecSnake(n, w, h, difficulty, seed=0)
+        for g in range(n):
+            env.food[g] = food_of(states[g], w)
+        finished = 0
+        ticks = 0
+        while finished < GAMES and ticks < MAX_TICKS * 4:
+            ticks += 1
+            actions = [random_action(rng) for _ in range(n)]
+            _, done = env.step(np.array([-1 if a is None else a for a in actions], dtype=np.int32))
+            for g in range(n):
+                st, _, engine_done = engines[g].step(actions[g])
+                self.assertEqual(bool(done[g]), engine_done, f"game {g} tick {st.ticks}")
+                if engine_done:
+                    expected = DEATH_WIN if st.won else death_codes[st.death]
+                    self.assertEqual(int(env.death[g]), expected)
+                    self.assertEqual(int(env.final_score[g]), st.score)
+                    self.assertEqual(int(env.final_ticks[g]), st.ticks)
+                    finished += 1
+                    # VecSnake 已自动重开，SnakeEngine 跟着重开
+                    st = states[g] = engines[g].reset(rng.randrange(2**32))
+                else:
+                    self.assertEqual(env.snake_cells(g).tolist(), cells_of(st.snake, w))
+                    self.assertEqual(int(env.direction[g]), st.direction)
+                    self.assertEqual(int(env.score[g]), st.score)
+                env.food[g] = food_of(st, w)
+        self.assertGreaterEqual(finished, GAMES)
+
+    def test_boards(self):
+        for w, h, difficulty in BOARDS:
+            with self.subTest(board=f"{w}x{h}", difficulty=difficulty):
+                self.run_board(w, h, difficulty)
+
+
+class CompactStateParity(unittest.TestCase):
+    def run_board(self, w, h, difficulty):
+        rng = random.Random(f"compact-{w}x{h}-{difficulty}")
+        engine = SnakeEngine(w, h, difficulty)
+        for _ in range(GAMES):
+            state = engine.reset(rng.randrange(2**32))
+            st = CompactState(w, h, difficulty)
+            st.food = food_of(state, w)
+            engine_done = False
+            while not engine_done and state.ticks < MAX_TICKS:
+                action = random_action(rng)
+                _, done = st.step(action)
+                state, _, engine_done = engine.step(action)
+                self.assertEqual(done, engine_done, f"tick {state.ticks}")
+                self.assertEqual(st.snake_cells(), cells_of(state.snake, w), f"tick {state.ticks}")
+                self.assertEqual(st.direction, state.direction)
+                self.assertEqual(st.score, state.score)
+                self.assertEqual((st.won, st.death), (state.won, state.death))
+                st.food = food_of(state, w)
+
+    def test_boards(self):
+        for w, h, difficulty in BOARDS:
+            with self.subTest(board=f"{w}x{h}", difficulty=difficulty):
+                self.run_board(w, h, difficulty)
+
+
+class NullWriter:
+    def write(self, data):
+        pass
+
+
+class RoomParity(unittest.TestCase):
+    # 单人房间：把玩家放到与 SnakeEngine 相同的初始位置，规则应与单机完全一致
+
+    def start_room(self, state, w, h, difficulty):
+        room = Room("parity", w, h, difficulty, seed=0)
+        p = room.add_player(NullWriter())
+        p.snake = deque(state.snake)
+        for x, y in p.snake:
+            room.occ[y * w + x] = 1
+            room.free.take(y * w + x)
+        p.direction = UP
+        p.alive = True
+        self.sync_food(room, state, w)
+        return room, p
+
+    def sync_food(self, room, state, w):
+        # 房间的食物格在 free 中是占用的：先释放房间自己放的食物，再占用 SnakeEngine 的落点
+        for x, y in room.food:
+            room.free.release(y * w + x)
+        room.food = []
+        if state.food is not None:
+            room.food.append(state.food)
+            room.free.take(food_of(state, w))
+
+    def run_board(self, w, h, difficulty):
+        rng = random.Random(f"room-{w}x{h}-{difficulty}")
+        engine = SnakeEngine(w, h, difficulty)
+        for _ in range(GAMES):
+            state = engine.reset(rng.randrange(2**32))
+            room, p = self.start_room(state, w, h, difficulty)
+            engine_done = False
+            while not engine_done and state.ticks < MAX_TICKS:
+                action = random_action(rng)
+                if action is not None:
+                    room.turn(p, action)
+                delta = room.step()
+                state, _, engine_done = engine.step(action)
+                if engine_done and not state.won:
+                    self.assertIn(p.pid, delta.get("dead", ()), f"tick {state.ticks}: {state.death}")
+                    break
+                self.assertNotIn(p.pid, delta.get("dead", ()), f"tick {state.ticks}")
+                self.assertEqual(list(p.snake), list(state.snake), f"tick {state.ticks}")
+                self.assertEqual(p.direction, state.direction)
+                self.assertEqual(p.score, state.score)
+                self.sync_food(room, state, w)
+
+    def test_boards(self):
+        for w, h, difficulty in BOARDS:
+            with self.subTest(board=f"{w}x{h}", difficulty=difficulty):
+                self.run_board(w, h, difficulty)
+
+
+if __name__ == "__main__":
+    unittest.main()